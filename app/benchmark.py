@@ -0,0 +1,327 @@
+"""Benchmark Suite for the Items Service
+
+Boots ``app.main:app`` in-process behind httpx's ASGI transport (no server or
+network involved) and drives a mixed read/write workload at a configurable
+concurrency against ``/items``, ``/items/{item_id}`` and ``/health``.
+
+Reports throughput, p50/p95/p99 latency per operation and memory growth.
+Results can be saved per commit and compared with an earlier run:
+
+    python -m app.benchmark                                   # read-heavy, memory
+    python -m app.benchmark --workload mixed --backend sqlite --concurrency 32
+    python -m app.benchmark --save                            # benchmark_results/
+    python -m app.benchmark --compare benchmark_results/abc1234-read-heavy-memory.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+# Operation mix of each workload, as relative weights
+WORKLOADS = {
+    "read-heavy": {"get_item": 80, "list_items": 10, "update_item": 5, "health": 5},
+    "mixed": {
+        "get_item": 50,
+        "list_items": 10,
+        "create_item": 15,
+        "update_item": 20,
+        "health": 5,
+    },
+    "write-heavy": {"get_item": 20, "create_item": 40, "update_item": 40},
+    "polling": {"get_item_cached": 70, "list_items_cached": 25, "health": 5},
+}
+
+RESULTS_DIR = "benchmark_results"
+
+
+def rss_mb():
+    """Current resident set size in MB (peak RSS where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(q / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(latencies, elapsed):
+    """Latency percentiles (ms) and throughput for one list of samples (s)"""
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "throughput_rps": round(len(values) / elapsed, 1) if elapsed else None,
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+
+
+class Workload:
+    """Issues randomly chosen operations and records their latency"""
+
+    def __init__(self, client, mix, items, seed):
+        self.client = client
+        self.ops = list(mix)
+        self.weights = [mix[op] for op in self.ops]
+        self.items = items
+        self.next_id = items + 1
+        self.seed = seed
+        self.latencies = {op: [] for op in self.ops}
+        self.errors = {}
+        self.etags = {}
+
+    def item_payload(self, rng, item_id):
+        return {
+            "id": item_id,
+            "name": f"item-{rng.randrange(10_000)}",
+            "description": "benchmark item",
+            "price": round(rng.uniform(1, 1000), 2),
+        }
+
+    async def request(self, rng, op):
+        client = self.client
+        if op == "get_item":
+            return await client.get(f"/items/{rng.randint(1, self.items)}")
+        if op == "get_item_cached":
+            item_id = rng.randint(1, min(self.items, 100))
+            headers = {}
+            if item_id in self.etags:
+                headers["If-None-Match"] = self.etags[item_id]
+            response = await client.get(f"/items/{item_id}", headers=headers)
+            if "etag" in response.headers:
+                self.etags[item_id] = response.headers["etag"]
+            return response
+        if op in ("list_items", "list_items_cached"):
+            after = rng.randrange(max(self.items - 100, 1))
+            if op == "list_items_cached":
+                after = 0
+            return await client.get("/items", params={"limit": 100, "after": after})
+        if op == "create_item":
+            item_id = self.next_id
+            self.next_id += 1
+            return await client.post("/items", json=self.item_payload(rng, item_id))
+        if op == "update_item":
+            item_id = rng.randint(1, self.items)
+            return await client.put(
+                f"/items/{item_id}", json=self.item_payload(rng, item_id)
+            )
+        if op == "health":
+            return await client.get("/health")
+        raise ValueError(f"Unknown operation: {op}")
+
+    async def worker(self, index, count, record=True):
+        rng = random.Random(self.seed * 1000 + index)
+        for _ in range(count):
+            op = rng.choices(self.ops, self.weights)[0]
+            start = time.perf_counter()
+            response = await self.request(rng, op)
+            elapsed = time.perf_counter() - start
+            if response.status_code >= 400:
+                key = f"{op} {response.status_code}"
+                self.errors[key] = self.errors.get(key, 0) + 1
+            if record:
+                self.latencies[op].append(elapsed)
+
+    async def run(self, requests, concurrency, record=True):
+        per_worker = [requests // concurrency] * concurrency
+        for i in range(requests % concurrency):
+            per_worker[i] += 1
+        await asyncio.gather(
+            *(self.worker(i, n, record) for i, n in enumerate(per_worker))
+        )
+
+
+async def run_benchmark(args):
+    # Imported here so that the environment set in main() is what the
+    # application's config sees.
+    import httpx
+    from app.main import app, item_store
+
+    transport = httpx.ASGITransport(app=app)
+    client = httpx.AsyncClient(transport=transport, base_url="http://bench")
+    async with client:
+        seed_items = [
+            {"id": i, "name": f"item-{i}", "description": "seed", "price": float(i)}
+            for i in range(1, args.items + 1)
+        ]
+        for start in range(0, len(seed_items), 5000):
+            response = await client.post(
+                "/items/bulk", json=seed_items[start : start + 5000]
+            )
+            response.raise_for_status()
+
+        workload = Workload(client, WORKLOADS[args.workload], args.items, args.seed)
+        if args.warmup:
+            await workload.run(args.warmup, args.concurrency, record=False)
+            workload.errors.clear()
+
+        if args.trace_memory:
+            tracemalloc.start()
+        rss_before = rss_mb()
+        start = time.perf_counter()
+        await workload.run(args.requests, args.concurrency)
+        elapsed = time.perf_counter() - start
+        rss_after = rss_mb()
+        memory = {
+            "rss_before_mb": round(rss_before, 2),
+            "rss_after_mb": round(rss_after, 2),
+            "rss_growth_mb": round(rss_after - rss_before, 2),
+        }
+        if args.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            memory["traced_current_mb"] = round(current / 2**20, 2)
+            memory["traced_peak_mb"] = round(peak / 2**20, 2)
+
+    item_store.close()
+    all_latencies = [v for values in workload.latencies.values() for v in values]
+    return {
+        "overall": summarize(all_latencies, elapsed),
+        "operations": {
+            op: summarize(values, elapsed)
+            for op, values in workload.latencies.items()
+            if values
+        },
+        "errors": workload.errors,
+        "elapsed_s": round(elapsed, 3),
+        "memory": memory,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_report(report, baseline=None):
+    header = (
+        f"{'operation':<18} {'requests':>9} {'req/s':>10} {'p50 ms':>9} "
+        f"{'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+    )
+    print(header)
+    print("-" * len(header))
+    rows = [("overall", report["results"]["overall"])]
+    rows += sorted(report["results"]["operations"].items())
+    for name, stats in rows:
+        print(
+            f"{name:<18} {stats['requests']:>9,} {stats['throughput_rps']:>10,.1f} "
+            f"{stats['p50_ms']:>9.3f} {stats['p95_ms']:>9.3f} {stats['p99_ms']:>9.3f} "
+            f"{stats['max_ms']:>9.3f}"
+        )
+    memory = report["results"]["memory"]
+    print(
+        f"\nRSS {memory['rss_before_mb']:.1f} -> {memory['rss_after_mb']:.1f} MB "
+        f"({memory['rss_growth_mb']:+.1f} MB)"
+    )
+    if "traced_peak_mb" in memory:
+        print(f"Traced Python memory peak {memory['traced_peak_mb']:.1f} MB")
+    if report["results"]["errors"]:
+        print(f"Errors: {report['results']['errors']}")
+
+    if baseline is None:
+        return
+    print(f"\nCompared with {baseline['commit']} ({baseline['timestamp']}):")
+    base_rows = {"overall": baseline["results"]["overall"]}
+    base_rows.update(baseline["results"]["operations"])
+    for name, stats in rows:
+        base = base_rows.get(name)
+        if base is None:
+            continue
+        deltas = []
+        for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            if base[key]:
+                change = (stats[key] - base[key]) / base[key] * 100
+                deltas.append(f"{key} {change:+.1f}%")
+        print(f"  {name:<18} " + ", ".join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--workload", choices=sorted(WORKLOADS), default="read-heavy")
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--items", type=int, default=10_000, help="Items seeded")
+    parser.add_argument("--requests", type=int, default=20_000, help="Timed requests")
+    parser.add_argument("--warmup", type=int, default=1_000, help="Untimed requests")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--trace-memory", action="store_true",
+        help="Also trace Python allocations (slows the run down)"
+    )
+    parser.add_argument("--json", help="Write the report to this file")
+    parser.add_argument(
+        "--save", action="store_true",
+        help=f"Write the report to {RESULTS_DIR}/<commit>-<workload>-<backend>.json"
+    )
+    parser.add_argument("--compare", help="Earlier report to compare against")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="items-bench-")
+    os.environ["STORAGE_BACKEND"] = args.backend
+    os.environ["DATABASE_PATH"] = os.path.join(workdir, "items.db")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.pop("METRICS_DIR", None)
+
+    results = asyncio.run(run_benchmark(args))
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "settings": {
+            key: getattr(args, key)
+            for key in ("workload", "backend", "items", "requests", "warmup",
+                        "concurrency", "seed")
+        },
+        "json_backend": os.getenv("JSON_BACKEND", "json"),
+        "results": results,
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    paths = [args.json] if args.json else []
+    if args.save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        name = f"{report['commit']}-{args.workload}-{args.backend}.json"
+        paths.append(os.path.join(RESULTS_DIR, name))
+    for path in paths:
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n[OK] Results written to {path}")
+
+    for name in os.listdir(workdir):
+        os.remove(os.path.join(workdir, name))
+    os.rmdir(workdir)
+    return 1 if results["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""Versioned Response Cache"""
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Hashable, List, Optional
+
+STRONG_ETAG = re.compile(r'(?<!W/)"v(\d+)"')
+
+
+def make_etag(version: int) -> str:
+    """Strong ETag for a store version"""
+    return f'"v{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches ``etag`` (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def if_match_versions(if_match: Optional[str]) -> Optional[List[int]]:
+    """Versions named by an If-Match header (strong comparison)
+
+    None means no precondition (header missing or ``*``); an empty list
+    means nothing can match.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    return [int(version) for version in STRONG_ETAG.findall(if_match)]
+
+
+class ResponseCache:
+    """LRU cache of serialized response bodies, keyed by request and version.
+
+    An entry is only returned for the store version it was built from, so a
+    write anywhere (including another worker) invalidates it without any
+    explicit eviction; stale entries age out of the LRU.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable, version: int) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Hashable, version: int, body: bytes) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (version, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -12,8 +12,34 @@ class Config:
     DEBUG = os.getenv("DEBUG", "False") == "True"
     ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    # Keep one in N info log records from the /health and /ready probes
+    LOG_PROBE_SAMPLE_RATE = int(os.getenv("LOG_PROBE_SAMPLE_RATE", "100"))
     API_TITLE = "Python Application"
     API_VERSION = "1.0.0"
+    # Item storage: "sqlite" (persistent, shared by all workers) or "memory"
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "sqlite")
+    DATABASE_PATH = os.getenv("DATABASE_PATH", "items.db")
+    # GET /items paging: largest accepted ``limit`` and NDJSON export batch size
+    MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+    STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+    # Largest number of items, and request body size in bytes, accepted by
+    # the /items/bulk endpoints
+    MAX_BULK_ITEMS = int(os.getenv("MAX_BULK_ITEMS", "10000"))
+    MAX_BULK_BYTES = int(os.getenv("MAX_BULK_BYTES", str(8 * 1024 * 1024)))
+    # Serialized GET responses kept per worker (0 disables the cache)
+    RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+    # JSON encoder for responses: "json" (stdlib) or "orjson" (if installed)
+    JSON_BACKEND = os.getenv("JSON_BACKEND", "json")
+    # Directory shared by uvicorn workers to merge /metrics (unset: this process only)
+    METRICS_DIR = os.getenv("METRICS_DIR")
+    METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+    # Feature flags: a local JSON file (hot-reloaded) or else an SSM hierarchy
+    # to read (neither: no flags), the environment whose overrides apply,
+    # and seconds a fetched SSM snapshot is cached
+    FLAGS_FILE = os.getenv("FLAGS_FILE")
+    FLAGS_SSM_PATH = os.getenv("FLAGS_SSM_PATH")
+    FLAGS_ENVIRONMENT = os.getenv("FLAGS_ENVIRONMENT", ENVIRONMENT)
+    FLAGS_CACHE_TTL = float(os.getenv("FLAGS_CACHE_TTL", "30"))
 
 
 class DevelopmentConfig(Config):
@@ -33,6 +59,7 @@ class TestingConfig(Config):
     DEBUG = True
     ENVIRONMENT = "testing"
     TESTING = True
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "memory")
 
 
 def get_config():
@@ -0,0 +1,65 @@
+"""Feature Flags
+
+Flag snapshots are evaluated with the rule engine from ``feature-flag/``
+(percentage rollouts, user/tenant targeting, environment overrides), the
+same code the flag Lambda runs. Those modules are deployed flat into the
+Lambda package, so that directory is put on ``sys.path`` and they are
+imported as top-level modules here too.
+
+Flags come from a provider: ``FLAGS_FILE`` names a local JSON file that is
+reloaded when it changes (no network involved), ``FLAGS_SSM_PATH`` an SSM
+hierarchy read through the cached flag client (needs boto3). With neither
+set no flags are defined and every lookup returns its default.
+"""
+
+import logging
+import os
+import sys
+from typing import Optional
+
+FEATURE_FLAG_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "feature-flag"
+)
+if FEATURE_FLAG_DIR not in sys.path:
+    sys.path.append(FEATURE_FLAG_DIR)
+
+from flag_providers import FlagProvider, create_provider  # noqa: E402
+from flag_rules import CompiledFlags, RuleEngine  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+
+class FeatureFlags:
+    """Compiled view of the current flag snapshot"""
+
+    def __init__(self, provider: FlagProvider, environment: Optional[str] = None):
+        self.provider = provider
+        self.engine = RuleEngine(environment)
+
+    def snapshot(self) -> CompiledFlags:
+        """Flags compiled from the current config (recompiled only when it changes)"""
+        return self.engine.compile(self.provider.get_config())
+
+    def evaluate(self, name: str, context: Optional[dict] = None, default=None):
+        return self.snapshot().evaluate(name, context, default)
+
+    def is_enabled(self, name: str, context: Optional[dict] = None) -> bool:
+        return self.snapshot().is_enabled(name, context)
+
+    def close(self) -> None:
+        self.provider.close()
+
+
+def create_flags(config) -> FeatureFlags:
+    """Feature flags from the provider selected by ``config``"""
+    if config.FLAGS_FILE:
+        logger.info("Reading feature flags from %s", config.FLAGS_FILE)
+        provider = create_provider("file", file_path=config.FLAGS_FILE)
+    elif config.FLAGS_SSM_PATH:
+        logger.info("Reading feature flags from SSM path %s", config.FLAGS_SSM_PATH)
+        provider = create_provider(
+            "ssm", path=config.FLAGS_SSM_PATH, ttl=config.FLAGS_CACHE_TTL
+        )
+    else:
+        provider = create_provider("static")
+    return FeatureFlags(provider, config.FLAGS_ENVIRONMENT)
@@ -0,0 +1,135 @@
+"""Structured, Queue-Based Logging
+
+Handlers only put records on an in-memory queue; a background
+``QueueListener`` thread formats them as JSON lines and writes them to
+stdout, so request handlers never block on log I/O. Messages use lazy
+%-style arguments, which are merged in the listener thread as well.
+
+Each request gets an id (taken from ``X-Request-ID`` or generated) that is
+attached to every record logged while handling it and echoed back in the
+response. Info-level records from probe routes are sampled.
+"""
+
+import atexit
+import itertools
+import json
+import logging
+import queue
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Request being handled in the current task or thread
+request_id_var: ContextVar = ContextVar("request_id", default=None)
+route_var: ContextVar = ContextVar("route", default=None)
+
+PROBE_PATHS = ("/health", "/ready")
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record):
+        created = datetime.fromtimestamp(record.created, timezone.utc)
+        entry = {
+            "timestamp": created.isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id is not None:
+            entry["request_id"] = request_id
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class ContextQueueHandler(QueueHandler):
+    """QueueHandler that tags records with the request id and defers formatting
+
+    The stock ``prepare`` formats the message in the calling thread; here the
+    record goes on the queue as is and the listener formats it. Log arguments
+    must therefore not be mutated after the call.
+    """
+
+    def prepare(self, record):
+        record.request_id = request_id_var.get()
+        return record
+
+
+class ProbeSamplingFilter(logging.Filter):
+    """Keep one in ``rate`` info/debug records logged while serving a probe"""
+
+    def __init__(self, paths=PROBE_PATHS, rate=100):
+        super().__init__()
+        self.paths = set(paths)
+        self.rate = max(int(rate), 1)
+        self._counters = {path: itertools.count() for path in self.paths}
+
+    def filter(self, record):
+        route = route_var.get()
+        if route not in self.paths or record.levelno > logging.INFO:
+            return True
+        return next(self._counters[route]) % self.rate == 0
+
+
+class RequestContextMiddleware:
+    """ASGI middleware setting the request id and route for log records"""
+
+    def __init__(self, app, header="x-request-id"):
+        self.app = app
+        self.header = header.lower().encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == self.header:
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or uuid.uuid4().hex
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((self.header, request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        id_token = request_id_var.set(request_id)
+        route_token = route_var.set(scope["path"])
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            route_var.reset(route_token)
+            request_id_var.reset(id_token)
+
+
+def setup_logging(config):
+    """Route the root logger through a queue to a JSON stdout listener
+
+    Level comes from ``config.LOG_LEVEL``; probe routes keep one in
+    ``config.LOG_PROBE_SAMPLE_RATE`` info records. Returns the listener.
+    """
+    log_queue = queue.SimpleQueue()
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JSONFormatter())
+    listener = QueueListener(log_queue, stream, respect_handler_level=True)
+
+    handler = ContextQueueHandler(log_queue)
+    handler.addFilter(ProbeSamplingFilter(rate=config.LOG_PROBE_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(config.LOG_LEVEL.upper())
+
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
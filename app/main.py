@@ -1,20 +1,80 @@
 """Main FastAPI Application"""
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from typing import List, Optional
+import json
 import logging
+import sqlite3
+from contextlib import asynccontextmanager
 from datetime import datetime
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+from app.cache import ResponseCache, etag_matches, if_match_versions, make_etag
+from app.config import config
+from app.flags import create_flags
+from app.logging_config import RequestContextMiddleware, setup_logging
+from app import metrics
+from app.serialization import (
+    encode_model,
+    get_dumps,
+    json_response,
+    make_response_class,
+)
+from app.storage import VersionConflict, create_store
+
+# Configure logging: JSON lines written by a background listener thread
+setup_logging(config)
 logger = logging.getLogger(__name__)
 
+# JSON encoder selected by config.JSON_BACKEND, used by the pre-encoded
+# endpoints below and by the default response class
+dumps = get_dumps(config.JSON_BACKEND)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load the first flag snapshot on startup, release resources on shutdown"""
+    # Fetched off the event loop: the SSM provider blocks on its first read
+    await run_in_threadpool(feature_flags.snapshot)
+    yield
+    metrics_exporter.stop()
+    feature_flags.close()
+    item_store.close()
+
+
 app = FastAPI(
     title="Python Application",
     description="Sample Python application with Jenkins CI/CD pipeline",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=make_response_class(dumps),
+    lifespan=lifespan
+)
+app.add_middleware(RequestContextMiddleware)
+
+# Request metrics, merged across workers through config.METRICS_DIR
+request_metrics = metrics.Metrics()
+metrics_exporter = metrics.MultiprocessExporter(
+    request_metrics, config.METRICS_DIR, config.METRICS_FLUSH_SECONDS
 )
+metrics_exporter.start()
+app.add_middleware(metrics.MetricsMiddleware, metrics=request_metrics)
+
+
+@app.exception_handler(sqlite3.OperationalError)
+async def database_busy(request: Request, exc: sqlite3.OperationalError):
+    """503 when SQLite stays locked past its busy timeout; other errors are 500s"""
+    message = str(exc).lower()
+    if "locked" not in message and "busy" not in message:
+        raise exc
+    logger.warning("Database busy on %s %s: %s", request.method, request.url.path, exc)
+    return json_response(
+        dumps({"detail": "Database is busy, retry shortly"}),
+        status_code=503,
+        headers={"Retry-After": "1"}
+    )
 
 
 class Item(BaseModel):
@@ -32,8 +92,28 @@ class HealthResponse(BaseModel):
     version: str
 
 
-# In-memory storage for demo
-items_db = {}
+# Item storage backend selected by config.STORAGE_BACKEND
+item_store = create_store(config)
+response_cache = ResponseCache(config.RESPONSE_CACHE_SIZE)
+
+# Feature flags, compiled once per snapshot by the shared rule engine
+feature_flags = create_flags(config)
+
+
+def cached_response(key, version: int, if_none_match: Optional[str], build):
+    """Conditional, cached JSON response for data at store ``version``
+
+    Answers 304 when the client already has this version, otherwise serves
+    the cached body for (key, version), calling ``build()`` only on a miss.
+    """
+    etag = make_etag(version)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    body = response_cache.get(key, version)
+    if body is None:
+        body = dumps(build())
+        response_cache.put(key, version, body)
+    return json_response(body, headers={"ETag": etag})
 
 
 @app.get("/", tags=["Root"])
@@ -46,6 +126,9 @@ async def root():
             "health": "/health",
             "ready": "/ready",
             "items": "/items",
+            "search": "/items/search",
+            "flags": "/flags",
+            "metrics": "/metrics",
             "docs": "/docs"
         }
     }
@@ -55,11 +138,11 @@ async def root():
 async def health_check():
     """Health check endpoint for Kubernetes liveness probe"""
     logger.info("Health check requested")
-    return HealthResponse(
+    return json_response(encode_model(HealthResponse(
         status="healthy",
         timestamp=datetime.utcnow().isoformat(),
         version="1.0.0"
-    )
+    )))
 
 
 @app.get("/ready", tags=["Health"])
@@ -72,79 +155,368 @@ async def readiness_check():
     }
 
 
+def parse_fields(fields: Optional[str]):
+    """Validate a comma-separated field list for projection"""
+    if not fields:
+        return None
+    selected = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in Item.model_fields]
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown fields: {', '.join(unknown)}"
+        )
+    return selected
+
+
+def project(item: dict, fields):
+    """Keep only the requested fields of an item"""
+    if fields is None:
+        return item
+    return {name: item[name] for name in fields}
+
+
+def ndjson_lines(after: Optional[int], limit: Optional[int], fields):
+    """Encode items as newline-delimited JSON, reading the store in batches"""
+    batch_size = min(limit or config.STREAM_BATCH_SIZE, config.STREAM_BATCH_SIZE)
+    items = item_store.iter_items(after, batch_size)
+    for count, item in enumerate(items):
+        if limit is not None and count >= limit:
+            return
+        yield dumps(project(item, fields)) + b"\n"
+
+
 @app.get("/items", tags=["Items"])
-async def list_items():
-    """Get all items"""
-    logger.info("Listing all items")
-    return {
-        "items": list(items_db.values()),
-        "count": len(items_db)
+def list_items(
+    limit: Optional[int] = Query(None, ge=1, le=config.MAX_PAGE_SIZE),
+    after: Optional[int] = Query(
+        None, description="Cursor: id of the last item of the previous page"
+    ),
+    fields: Optional[str] = Query(
+        None, description="Comma-separated list of fields to return"
+    ),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    if_none_match: Optional[str] = Header(None),
+):
+    """Get items, optionally one page at a time or streamed as NDJSON
+
+    Pages are keyed on the item id: pass the returned ``next_cursor`` as
+    ``after`` to fetch the next page. ``format=ndjson`` streams every
+    matching item (up to ``limit`` if given) without building the whole
+    response in memory.
+    """
+    logger.info(
+        "Listing items (after=%s, limit=%s, format=%s)", after, limit, format
+    )
+    selected = parse_fields(fields)
+
+    if format == "ndjson":
+        return StreamingResponse(
+            ndjson_lines(after, limit, selected), media_type="application/x-ndjson"
+        )
+
+    def build():
+        if limit is None and after is None:
+            items = item_store.list()
+            next_cursor = None
+        else:
+            items = item_store.page(after, limit or config.MAX_PAGE_SIZE)
+            full_page = len(items) == (limit or config.MAX_PAGE_SIZE)
+            next_cursor = items[-1]["id"] if items and full_page else None
+        return {
+            "items": [project(item, selected) for item in items],
+            "count": len(items),
+            "next_cursor": next_cursor
+        }
+
+    # Read the version first: a write racing with build() leaves the entry
+    # tagged with the older version, so it is never served as current.
+    version = item_store.version()
+    key = ("items", limit, after, tuple(selected or ()))
+    return cached_response(key, version, if_none_match, build)
+
+
+@app.get("/items/search", tags=["Items"])
+def search_items(
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    prefix: Optional[str] = Query(None, description="Name starts with"),
+    contains: Optional[str] = Query(None, description="Name contains"),
+    sort: str = Query(
+        "id", pattern="^-?(id|name|price)$", description="'-' prefix sorts descending"
+    ),
+    limit: int = Query(100, ge=1, le=config.MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(
+        None, description="Comma-separated list of fields to return"
+    ),
+):
+    """Search items by price range and name, using the store's indexes"""
+    logger.info(
+        "Searching items (price=%s..%s, prefix=%s, contains=%s, sort=%s, limit=%s)",
+        min_price, max_price, prefix, contains, sort, limit
+    )
+    selected = parse_fields(fields)
+    items = item_store.search(
+        min_price=min_price,
+        max_price=max_price,
+        prefix=prefix,
+        contains=contains,
+        sort=sort.lstrip("-"),
+        descending=sort.startswith("-"),
+        limit=limit,
+    )
+    return json_response(dumps({
+        "items": [project(item, selected) for item in items],
+        "count": len(items)
+    }))
+
+
+ItemList = TypeAdapter(List[Item])
+IdList = TypeAdapter(List[int])
+
+
+def too_large(detail: str):
+    """413 for a bulk request over the configured limits"""
+    return HTTPException(status_code=413, detail=detail)
+
+
+def parse_ndjson(body: bytes):
+    """Decode one JSON value per non-blank line; returns (values, line numbers)"""
+    values, line_numbers = [], []
+    for number, line in enumerate(body.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            values.append(json.loads(line))
+        except ValueError as e:
+            raise RequestValidationError([{
+                "type": "json_invalid",
+                "loc": (number,),
+                "msg": f"Invalid JSON on line {number}: {e}",
+                "input": line.decode(errors="replace")
+            }])
+        line_numbers.append(number)
+    return values, line_numbers
+
+
+async def read_batch(request: Request, adapter: TypeAdapter):
+    """Validate a JSON array or NDJSON request body
+
+    Oversized bodies are rejected with 413 before anything is parsed. NDJSON
+    errors are located by line number instead of array index.
+    """
+    limit = f"At most {config.MAX_BULK_ITEMS} items per request"
+    size = f"At most {config.MAX_BULK_BYTES} bytes per request"
+    length = request.headers.get("content-length")
+    if length is not None and length.isdigit() and int(length) > config.MAX_BULK_BYTES:
+        raise too_large(size)
+    body = await request.body()
+    if len(body) > config.MAX_BULK_BYTES:
+        raise too_large(size)
+
+    if "ndjson" in request.headers.get("content-type", ""):
+        values, line_numbers = parse_ndjson(body)
+        if len(values) > config.MAX_BULK_ITEMS:
+            raise too_large(limit)
+        try:
+            return adapter.validate_python(values)
+        except ValidationError as e:
+            errors = e.errors(include_url=False)
+            for error in errors:
+                error["loc"] = (line_numbers[error["loc"][0]],) + error["loc"][1:]
+            raise RequestValidationError(errors)
+
+    try:
+        batch = adapter.validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False))
+    if len(batch) > config.MAX_BULK_ITEMS:
+        raise too_large(limit)
+    return batch
+
+
+def bulk_summary(ids, results, error: str, atomic: bool):
+    """Compact result of a bulk operation; 409 if an atomic batch was rejected"""
+    failed = [
+        {"index": index, "id": item_id, "error": error}
+        for index, (item_id, ok) in enumerate(zip(ids, results))
+        if not ok
+    ]
+    committed = not (atomic and failed)
+    summary = {
+        "requested": len(ids),
+        "succeeded": len(ids) - len(failed) if committed else 0,
+        "failed": failed,
+        "committed": committed
     }
+    return json_response(dumps(summary), status_code=200 if committed else 409)
+
+
+@app.post("/items/bulk", tags=["Items"])
+async def bulk_create_items(request: Request, atomic: bool = False):
+    """Create many items from a JSON array or NDJSON body
+
+    With ``atomic=true`` nothing is stored unless every item can be created.
+    """
+    items = await read_batch(request, ItemList)
+    logger.info("Bulk creating %d items (atomic=%s)", len(items), atomic)
+    rows = [item.model_dump() for item in items]
+    results = await run_in_threadpool(item_store.create_many, rows, atomic)
+    ids = [item.id for item in items]
+    return bulk_summary(ids, results, "Item already exists", atomic)
+
+
+@app.put("/items/bulk", tags=["Items"])
+async def bulk_update_items(request: Request, atomic: bool = False):
+    """Update many items, matched on their ``id``, from a JSON array or NDJSON body"""
+    items = await read_batch(request, ItemList)
+    logger.info("Bulk updating %d items (atomic=%s)", len(items), atomic)
+    rows = [item.model_dump() for item in items]
+    results = await run_in_threadpool(item_store.update_many, rows, atomic)
+    ids = [item.id for item in items]
+    return bulk_summary(ids, results, "Item not found", atomic)
+
+
+@app.delete("/items/bulk", tags=["Items"])
+async def bulk_delete_items(request: Request, atomic: bool = False):
+    """Delete many items given a JSON array (or NDJSON) of item ids"""
+    item_ids = await read_batch(request, IdList)
+    logger.info("Bulk deleting %d items (atomic=%s)", len(item_ids), atomic)
+    results = await run_in_threadpool(item_store.delete_many, item_ids, atomic)
+    return bulk_summary(item_ids, results, "Item not found", atomic)
 
 
 @app.get("/items/{item_id}", tags=["Items"])
-async def get_item(item_id: int):
-    """Get a specific item by ID"""
-    logger.info(f"Getting item with ID: {item_id}")
-    if item_id not in items_db:
-        logger.warning(f"Item {item_id} not found")
+def get_item(item_id: int, if_none_match: Optional[str] = Header(None)):
+    """Get a specific item by ID
+
+    Responses carry a strong ETag; ``If-None-Match`` with the current one
+    returns 304.
+    """
+    logger.info("Getting item with ID: %s", item_id)
+    item, version = item_store.get_versioned(item_id)
+    if item is None:
+        logger.warning("Item %s not found", item_id)
         raise HTTPException(status_code=404, detail="Item not found")
-    return items_db[item_id]
+    return cached_response(("item", item_id), version, if_none_match, lambda: item)
 
 
 @app.post("/items", tags=["Items"])
-async def create_item(item: Item):
+def create_item(item: Item):
     """Create a new item"""
-    logger.info(f"Creating item: {item.name}")
-    if item.id in items_db:
-        logger.warning(f"Item {item.id} already exists")
+    logger.info("Creating item: %s", item.name)
+    data = item.model_dump()
+    if not item_store.create(data):
+        logger.warning("Item %s already exists", item.id)
         raise HTTPException(status_code=400, detail="Item already exists")
-    items_db[item.id] = item
-    return {
+    return json_response(dumps({
         "message": "Item created successfully",
-        "item": item
-    }
+        "item": data
+    }))
+
+
+def expected_version(item_id: int, if_match: Optional[str]) -> Optional[int]:
+    """Item version an If-Match header requires, or None if unconditional"""
+    versions = if_match_versions(if_match)
+    if versions is None:
+        return None
+    if len(versions) == 1:
+        return versions[0]
+    # Several ETags: require whichever one is current (if any is)
+    _, current = item_store.get_versioned(item_id)
+    return current if current in versions else -1
+
+
+def precondition_failed(conflict: VersionConflict):
+    """412 carrying the current ETag so the client can re-read and retry"""
+    logger.warning(
+        "Item %s changed concurrently (now version %s)",
+        conflict.item_id, conflict.version
+    )
+    return HTTPException(
+        status_code=412,
+        detail="Item was modified by another request",
+        headers={"ETag": make_etag(conflict.version)}
+    )
 
 
 @app.put("/items/{item_id}", tags=["Items"])
-async def update_item(item_id: int, item: Item):
-    """Update an existing item"""
-    logger.info(f"Updating item with ID: {item_id}")
-    if item_id not in items_db:
-        logger.warning(f"Item {item_id} not found for update")
+def update_item(item_id: int, item: Item, if_match: Optional[str] = Header(None)):
+    """Update an existing item
+
+    Send the item's ETag in ``If-Match`` to update only if nobody changed it
+    since it was read; otherwise the response is 412.
+    """
+    logger.info("Updating item with ID: %s", item_id)
+    # Items are stored under the id in the path
+    data = item.model_dump()
+    data["id"] = item_id
+    try:
+        version = item_store.update(item_id, data, expected_version(item_id, if_match))
+    except VersionConflict as e:
+        raise precondition_failed(e)
+    if version is None:
+        logger.warning("Item %s not found for update", item_id)
         raise HTTPException(status_code=404, detail="Item not found")
-    items_db[item_id] = item
-    return {
+    return json_response(dumps({
         "message": "Item updated successfully",
-        "item": item
-    }
+        "item": data
+    }), headers={"ETag": make_etag(version)})
 
 
 @app.delete("/items/{item_id}", tags=["Items"])
-async def delete_item(item_id: int):
-    """Delete an item"""
-    logger.info(f"Deleting item with ID: {item_id}")
-    if item_id not in items_db:
-        logger.warning(f"Item {item_id} not found for deletion")
+def delete_item(item_id: int, if_match: Optional[str] = Header(None)):
+    """Delete an item, conditionally on ``If-Match`` as for updates"""
+    logger.info("Deleting item with ID: %s", item_id)
+    try:
+        deleted_item = item_store.delete(item_id, expected_version(item_id, if_match))
+    except VersionConflict as e:
+        raise precondition_failed(e)
+    if deleted_item is None:
+        logger.warning("Item %s not found for deletion", item_id)
         raise HTTPException(status_code=404, detail="Item not found")
-    deleted_item = items_db.pop(item_id)
-    return {
+    return json_response(dumps({
         "message": "Item deleted successfully",
         "item": deleted_item
-    }
+    }))
 
 
 @app.get("/stats", tags=["Stats"])
-async def get_stats():
+def get_stats():
     """Get application statistics"""
     logger.info("Getting application statistics")
     return {
-        "total_items": len(items_db),
+        "total_items": item_store.count(),
         "timestamp": datetime.utcnow().isoformat(),
         "version": "1.0.0"
     }
 
 
+@app.get("/flags", tags=["Flags"])
+def get_flags(user_id: Optional[str] = None, tenant_id: Optional[str] = None):
+    """Every feature flag evaluated for a user and/or tenant
+
+    A plain function, so it runs in the thread pool: the SSM provider
+    refreshes inline once its snapshot is too old or while it has none.
+    """
+    context = {}
+    if user_id is not None:
+        context["user_id"] = user_id
+    if tenant_id is not None:
+        context["tenant_id"] = tenant_id
+    return feature_flags.snapshot().evaluate_all(context)
+
+
+@app.get("/metrics", tags=["Stats"], response_class=PlainTextResponse)
+def get_metrics():
+    """Request and storage metrics in Prometheus text format"""
+    body = metrics.render(metrics_exporter.collect(), {
+        "items_stored": ("Items in the store", item_store.count()),
+        "items_store_version": ("Store collection version", item_store.version()),
+        "items_store_size_bytes": ("Storage size in bytes", item_store.size_bytes())
+    })
+    return PlainTextResponse(body, media_type=metrics.CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,300 @@
+"""Request Metrics in Prometheus Text Format
+
+``MetricsMiddleware`` records, per route template, request counts by status,
+a latency histogram and request/response body size histograms, plus the
+number of requests in flight. Everything is updated from the event loop
+thread with plain integer and list operations, so no locks are taken on the
+request path.
+
+With several uvicorn workers each process only sees its own requests. When
+``METRICS_DIR`` is set, every worker writes a snapshot of its metrics to
+``<METRICS_DIR>/metrics-<pid>.json`` every ``METRICS_FLUSH_SECONDS``, and a
+scrape of any worker merges all snapshots (its own one live). Counters of
+workers that have exited are kept; their in-flight gauge is dropped. Clear
+the directory when the service is (re)deployed.
+"""
+
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5]
+SIZE_BUCKETS = [64, 256, 1024, 4096, 16384, 65536, 262144, 1048576]
+
+# name -> (type, help, label names, bucket bounds)
+FAMILIES = {
+    "http_requests_total": (
+        "counter", "Total HTTP requests", ("method", "route", "status"), None
+    ),
+    "http_request_duration_seconds": (
+        "histogram", "HTTP request latency", ("method", "route"), LATENCY_BUCKETS
+    ),
+    "http_request_size_bytes": (
+        "histogram", "HTTP request body size", ("method", "route"), SIZE_BUCKETS
+    ),
+    "http_response_size_bytes": (
+        "histogram", "HTTP response body size", ("method", "route"), SIZE_BUCKETS
+    ),
+}
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """Fixed-bucket histogram; ``counts`` has one extra overflow bucket"""
+
+    __slots__ = ("bounds", "counts", "count", "total")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def to_dict(self):
+        return {"counts": list(self.counts), "count": self.count, "sum": self.total}
+
+
+class Metrics:
+    """Metric values of this process"""
+
+    def __init__(self):
+        self.values: Dict[str, dict] = {name: {} for name in FAMILIES}
+        self.in_flight = 0
+
+    def _histogram(self, name, labels):
+        histogram = self.values[name].get(labels)
+        if histogram is None:
+            histogram = self.values[name][labels] = Histogram(FAMILIES[name][3])
+        return histogram
+
+    def observe_request(self, method, route, status, seconds, request_bytes,
+                        response_bytes):
+        requests = self.values["http_requests_total"]
+        key = (method, route, str(status))
+        requests[key] = requests.get(key, 0) + 1
+        labels = (method, route)
+        self._histogram("http_request_duration_seconds", labels).observe(seconds)
+        self._histogram("http_request_size_bytes", labels).observe(request_bytes)
+        self._histogram("http_response_size_bytes", labels).observe(response_bytes)
+
+    def snapshot(self) -> dict:
+        """JSON-serializable copy of all values"""
+        families = {}
+        for name, values in self.values.items():
+            histogram = FAMILIES[name][0] == "histogram"
+            families[name] = [
+                [list(labels), value.to_dict() if histogram else value]
+                for labels, value in list(values.items())
+            ]
+        return {"pid": os.getpid(), "in_flight": self.in_flight, "families": families}
+
+
+def merge(snapshots) -> dict:
+    """Sum several snapshots into ``{"in_flight": n, "families": {...}}``"""
+    merged = {name: {} for name in FAMILIES}
+    in_flight = 0
+    for snapshot in snapshots:
+        in_flight += snapshot.get("in_flight", 0)
+        for name, entries in snapshot["families"].items():
+            if name not in merged:
+                continue
+            target = merged[name]
+            for labels, value in entries:
+                labels = tuple(labels)
+                if FAMILIES[name][0] == "counter":
+                    target[labels] = target.get(labels, 0) + value
+                    continue
+                current = target.get(labels)
+                if current is None:
+                    target[labels] = {
+                        "counts": list(value["counts"]),
+                        "count": value["count"],
+                        "sum": value["sum"],
+                    }
+                else:
+                    current["counts"] = [
+                        a + b for a, b in zip(current["counts"], value["counts"])
+                    ]
+                    current["count"] += value["count"]
+                    current["sum"] += value["sum"]
+    return {"in_flight": in_flight, "families": merged}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None) -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def render(merged: dict, gauges: Optional[Dict[str, tuple]] = None) -> str:
+    """Prometheus text exposition of merged metrics and extra ``gauges``
+
+    ``gauges`` maps a metric name to ``(help, value)``.
+    """
+    lines = [
+        "# HELP http_requests_in_flight HTTP requests being served",
+        "# TYPE http_requests_in_flight gauge",
+        f"http_requests_in_flight {merged['in_flight']}",
+    ]
+    for name, (kind, help_text, label_names, bounds) in FAMILIES.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(merged["families"][name].items()):
+            if kind == "counter":
+                lines.append(f"{name}{_labels(label_names, labels)} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(bounds + ["+Inf"], value["counts"]):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(
+                    f"{name}_bucket{_labels(label_names, labels, le)} {cumulative}"
+                )
+            lines.append(f"{name}_sum{_labels(label_names, labels)} {value['sum']}")
+            lines.append(f"{name}_count{_labels(label_names, labels)} {value['count']}")
+    for name, (help_text, value) in (gauges or {}).items():
+        if value is None:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class MultiprocessExporter:
+    """Share this worker's metrics with the other workers through a directory"""
+
+    def __init__(self, metrics: Metrics, directory: Optional[str] = None,
+                 interval: float = 5.0):
+        self.metrics = metrics
+        self.directory = directory
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, f"metrics-{os.getpid()}.json")
+
+    def flush(self) -> None:
+        """Atomically replace this worker's snapshot file"""
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.metrics.snapshot(), f)
+        os.replace(tmp, self.path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            # Keep flushing whatever fails: a dead thread would leave the
+            # other workers merging this worker's last snapshot forever
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Cannot write metrics snapshot to %s", self.path)
+
+    def start(self) -> None:
+        if self.directory is None or self._thread is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(
+            target=self._run, name="metrics-flush", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.flush()
+
+    def collect(self) -> dict:
+        """Merged metrics of every worker, this one read live"""
+        own = self.metrics.snapshot()
+        snapshots = [own]
+        if self.directory is not None:
+            for path in glob.glob(os.path.join(self.directory, "metrics-*.json")):
+                try:
+                    with open(path) as f:
+                        snapshot = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if snapshot.get("pid") == own["pid"]:
+                    continue
+                if not _pid_alive(snapshot.get("pid", 0)):
+                    snapshot["in_flight"] = 0
+                snapshots.append(snapshot)
+        return merge(snapshots)
+
+
+class MetricsMiddleware:
+    """ASGI middleware feeding :class:`Metrics`, labelled by route template"""
+
+    def __init__(self, app, metrics: Metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        metrics = self.metrics
+        start = time.perf_counter()
+        sizes = [0, 0]  # request, response body bytes
+        status = 500
+
+        async def counting_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                sizes[0] += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sizes[1] += len(message.get("body", b""))
+            await send(message)
+
+        metrics.in_flight += 1
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            metrics.in_flight -= 1
+            # The router stores the matched route in the scope; label by its
+            # template so /items/1 and /items/2 share a series.
+            route = getattr(scope.get("route"), "path", "unmatched")
+            metrics.observe_request(
+                scope["method"], route, status, time.perf_counter() - start,
+                sizes[0], sizes[1]
+            )
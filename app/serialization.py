@@ -0,0 +1,70 @@
+"""JSON Serialization
+
+Endpoints on hot paths encode their payloads to bytes themselves and return
+them as a ``Response``, skipping FastAPI's ``jsonable_encoder`` pass.
+``JSON_BACKEND=orjson`` switches that encoder, and the app's default response
+class, to orjson when it is installed (``pip install orjson``).
+
+Both backends produce compact, UTF-8 JSON that decodes to the same values,
+but not always the same bytes: floats may be spelled differently (orjson
+writes ``1e16`` where the stdlib writes ``1e+16``). NaN and infinities
+raise ``ValueError`` with the stdlib backend, as in ``JSONResponse``, while
+orjson writes them as ``null``.
+"""
+
+import json
+import logging
+from typing import Any, Callable
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+JSON_BACKENDS = ("json", "orjson")
+
+
+def stdlib_dumps(content: Any) -> bytes:
+    """Encode like JSONResponse: compact, UTF-8, no NaN"""
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def get_dumps(backend: str) -> Callable[[Any], bytes]:
+    """Encoder for ``backend``, falling back to the stdlib if orjson is missing"""
+    if backend.lower() not in JSON_BACKENDS:
+        raise ValueError(f"Unknown JSON backend: {backend}")
+    if backend.lower() == "orjson":
+        if orjson is not None:
+            return orjson.dumps
+        logger.warning("JSON_BACKEND=orjson but orjson is not installed; using json")
+    return stdlib_dumps
+
+
+def make_response_class(dumps: Callable[[Any], bytes]):
+    """JSONResponse subclass rendering its content with ``dumps``"""
+
+    class FastJSONResponse(JSONResponse):
+        def render(self, content: Any) -> bytes:
+            return dumps(content)
+
+    return FastJSONResponse
+
+
+def encode_model(model: BaseModel) -> bytes:
+    """Encode a pydantic model with its compiled serializer"""
+    return model.__pydantic_serializer__.to_json(model)
+
+
+def json_response(body: bytes, status_code: int = 200, headers=None) -> Response:
+    """Response for an already encoded JSON body"""
+    return Response(
+        body, status_code=status_code, media_type="application/json", headers=headers
+    )
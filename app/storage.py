@@ -0,0 +1,713 @@
+"""Item Storage Backends"""
+
+import bisect
+import itertools
+import sqlite3
+import sys
+import threading
+from abc import ABC, abstractmethod
+from contextlib import ExitStack, contextmanager
+from typing import Dict, List, Optional, Set, Tuple
+
+# Fields accepted by ItemStore.search(sort=...)
+SORT_FIELDS = ("id", "name", "price")
+
+# Number of per-id write locks in MemoryItemStore
+LOCK_STRIPES = 64
+
+
+def _prefix_upper_bound(prefix: str) -> Optional[str]:
+    """Smallest string above every string starting with ``prefix``, or None
+    if there is none (the prefix is all U+10FFFF)"""
+    stripped = prefix.rstrip(chr(sys.maxunicode))
+    if not stripped:
+        return None
+    last = ord(stripped[-1]) + 1
+    if 0xD800 <= last <= 0xDFFF:
+        last = 0xE000  # surrogates cannot be encoded as UTF-8
+    return stripped[:-1] + chr(last)
+
+
+class VersionConflict(Exception):
+    """A conditional write found a different item version than expected"""
+
+    def __init__(self, item_id: int, version: int):
+        super().__init__(f"Item {item_id} is at version {version}")
+        self.item_id = item_id
+        self.version = version
+
+
+class NameTrie:
+    """Prefix tree over item names; each node holds the ids of all names below it"""
+
+    class Node:
+        __slots__ = ("children", "ids")
+
+        def __init__(self):
+            self.children: Dict[str, "NameTrie.Node"] = {}
+            self.ids: Set[int] = set()
+
+    def __init__(self):
+        self.root = self.Node()
+
+    def insert(self, name: str, item_id: int) -> None:
+        node = self.root
+        for char in name:
+            node = node.children.setdefault(char, self.Node())
+            node.ids.add(item_id)
+
+    def remove(self, name: str, item_id: int) -> None:
+        path = [self.root]
+        for char in name:
+            node = path[-1].children.get(char)
+            if node is None:
+                return
+            path.append(node)
+        for parent, char, node in reversed(list(zip(path, name, path[1:]))):
+            node.ids.discard(item_id)
+            if not node.ids:
+                del parent.children[char]
+
+    def ids(self, prefix: str) -> Set[int]:
+        """Ids of items whose name starts with ``prefix``"""
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return set()
+        return node.ids
+
+
+class ItemStore(ABC):
+    """Storage interface used by the items API.
+
+    Items are plain dicts with ``id``, ``name``, ``description`` and ``price``.
+    Backends keep secondary indexes on ``name`` and ``price``.
+
+    Every write bumps the store's collection version, and the written item
+    takes the new value as its own version, so versions are never reused
+    even when an id is deleted and created again.
+    """
+
+    @abstractmethod
+    def get(self, item_id: int) -> Optional[Dict]:
+        """Return the item or None"""
+
+    @abstractmethod
+    def get_versioned(self, item_id: int) -> Tuple[Optional[Dict], int]:
+        """Return ``(item, item_version)``, or ``(None, 0)`` if it does not exist"""
+
+    @abstractmethod
+    def version(self) -> int:
+        """Collection version, changed by every write"""
+
+    @abstractmethod
+    def list(self) -> List[Dict]:
+        """Return all items ordered by id"""
+
+    @abstractmethod
+    def page(self, after: Optional[int] = None, limit: int = 100) -> List[Dict]:
+        """Up to ``limit`` items with id > ``after``, ordered by id (keyset page)"""
+
+    def iter_items(self, after: Optional[int] = None, batch_size: int = 500):
+        """Yield items with id > ``after`` in id order, one page at a time"""
+        while True:
+            batch = self.page(after, batch_size)
+            yield from batch
+            if len(batch) < batch_size:
+                return
+            after = batch[-1]["id"]
+
+    @abstractmethod
+    def create(self, item: Dict) -> bool:
+        """Insert a new item; False if the id already exists"""
+
+    @abstractmethod
+    def update(
+        self, item_id: int, item: Dict, expected_version: Optional[int] = None
+    ) -> Optional[int]:
+        """Replace an existing item and return its new version, or None if it
+        does not exist.
+
+        With ``expected_version`` this is a compare-and-set: VersionConflict
+        is raised, and nothing written, unless the item is at that version.
+        """
+
+    @abstractmethod
+    def delete(
+        self, item_id: int, expected_version: Optional[int] = None
+    ) -> Optional[Dict]:
+        """Remove and return an item, or None if it does not exist.
+
+        ``expected_version`` makes it conditional, as for update.
+        """
+
+    @abstractmethod
+    def create_many(self, items: List[Dict], atomic: bool = False) -> List[bool]:
+        """Insert items; per-item success. If ``atomic``, nothing is written
+        unless every item succeeds."""
+
+    @abstractmethod
+    def update_many(self, items: List[Dict], atomic: bool = False) -> List[bool]:
+        """Replace items by their ``id``; per-item success, as for create_many"""
+
+    @abstractmethod
+    def delete_many(self, item_ids: List[int], atomic: bool = False) -> List[bool]:
+        """Remove items; per-item success, as for create_many.
+
+        A repeated id is deleted once and every occurrence reports that
+        result, so duplicates do not fail an atomic batch.
+        """
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of stored items"""
+
+    @abstractmethod
+    def find_by_name(self, name: str) -> List[Dict]:
+        """Items with exactly this name (name index)"""
+
+    @abstractmethod
+    def find_by_price(
+        self, min_price: Optional[float] = None, max_price: Optional[float] = None
+    ) -> List[Dict]:
+        """Items with min_price <= price <= max_price, ordered by price (price index)"""
+
+    @abstractmethod
+    def search(
+        self,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        prefix: Optional[str] = None,
+        contains: Optional[str] = None,
+        sort: str = "id",
+        descending: bool = False,
+        limit: Optional[int] = 100,
+    ) -> List[Dict]:
+        """Items matching every given filter, ordered by ``sort`` then id.
+
+        ``prefix`` and ``contains`` match the name case-sensitively.
+        """
+
+    def size_bytes(self) -> Optional[int]:
+        """Storage footprint in bytes, if the backend can tell"""
+        return None
+
+    def close(self) -> None:
+        """Release backend resources"""
+
+
+class MemoryItemStore(ItemStore):
+    """Process-local dict backend, used for tests and single-worker demos.
+
+    Writes hold a striped per-id lock for their check-then-act step and only
+    take the shared index lock for the short index update, so writers of
+    different items do not queue behind each other's checks.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()  # guards the indexes and versions
+        self._stripes = [threading.RLock() for _ in range(LOCK_STRIPES)]
+        self._items: Dict[int, Dict] = {}
+        self._ids: List[int] = []  # sorted ids, for keyset pagination
+        self._by_name: Dict[str, set] = {}
+        self._by_price: List[tuple] = []  # sorted (price, id)
+        self._by_name_order: List[tuple] = []  # sorted (name, id)
+        self._trie = NameTrie()
+        self._version = 0
+        self._versions: Dict[int, int] = {}
+
+    def _bump(self, item_id: int, deleted: bool = False) -> None:
+        self._version += 1
+        if deleted:
+            del self._versions[item_id]
+        else:
+            self._versions[item_id] = self._version
+
+    def _stripe(self, item_id: int):
+        return self._stripes[hash(item_id) % LOCK_STRIPES]
+
+    @contextmanager
+    def _locked(self, item_ids):
+        """Hold the stripes of ``item_ids``, in a fixed order, then the index lock"""
+        stripes = sorted({hash(item_id) % LOCK_STRIPES for item_id in item_ids})
+        with ExitStack() as stack:
+            for stripe in stripes:
+                stack.enter_context(self._stripes[stripe])
+            stack.enter_context(self._lock)
+            yield
+
+    def _check_version(self, item_id, expected_version):
+        if expected_version is not None:
+            current = self._versions[item_id]
+            if current != expected_version:
+                raise VersionConflict(item_id, current)
+
+    def _index(self, item: Dict) -> None:
+        self._by_name.setdefault(item["name"], set()).add(item["id"])
+        bisect.insort(self._by_price, (item["price"], item["id"]))
+        bisect.insort(self._by_name_order, (item["name"], item["id"]))
+        self._trie.insert(item["name"], item["id"])
+
+    def _unindex(self, item: Dict) -> None:
+        ids = self._by_name.get(item["name"])
+        if ids is not None:
+            ids.discard(item["id"])
+            if not ids:
+                del self._by_name[item["name"]]
+        for index, key in (
+            (self._by_price, (item["price"], item["id"])),
+            (self._by_name_order, (item["name"], item["id"])),
+        ):
+            pos = bisect.bisect_left(index, key)
+            if pos < len(index) and index[pos] == key:
+                del index[pos]
+        self._trie.remove(item["name"], item["id"])
+
+    def get(self, item_id):
+        return self._items.get(item_id)
+
+    def get_versioned(self, item_id):
+        with self._lock:
+            return self._items.get(item_id), self._versions.get(item_id, 0)
+
+    def version(self):
+        return self._version
+
+    def list(self):
+        with self._lock:
+            return [self._items[item_id] for item_id in self._ids]
+
+    def page(self, after=None, limit=100):
+        with self._lock:
+            start = 0 if after is None else bisect.bisect_right(self._ids, after)
+            ids = self._ids[start : start + limit]
+            return [self._items[item_id] for item_id in ids]
+
+    def create(self, item):
+        with self._stripe(item["id"]):
+            if item["id"] in self._items:
+                return False
+            with self._lock:
+                self._items[item["id"]] = item
+                bisect.insort(self._ids, item["id"])
+                self._index(item)
+                self._bump(item["id"])
+            return True
+
+    def update(self, item_id, item, expected_version=None):
+        with self._stripe(item_id):
+            old = self._items.get(item_id)
+            if old is None:
+                return None
+            self._check_version(item_id, expected_version)
+            with self._lock:
+                self._unindex(old)
+                self._items[item_id] = item
+                self._index(item)
+                self._bump(item_id)
+            return self._versions[item_id]
+
+    def delete(self, item_id, expected_version=None):
+        with self._stripe(item_id):
+            if item_id not in self._items:
+                return None
+            self._check_version(item_id, expected_version)
+            with self._lock:
+                item = self._items.pop(item_id)
+                del self._ids[bisect.bisect_left(self._ids, item_id)]
+                self._unindex(item)
+                self._bump(item_id, deleted=True)
+            return item
+
+    def create_many(self, items, atomic=False):
+        with self._locked([item["id"] for item in items]):
+            seen = set()
+            results = []
+            for item in items:
+                results.append(item["id"] not in self._items and item["id"] not in seen)
+                seen.add(item["id"])
+            if atomic and not all(results):
+                return results
+            for item, ok in zip(items, results):
+                if ok:
+                    self.create(item)
+            return results
+
+    def update_many(self, items, atomic=False):
+        with self._locked([item["id"] for item in items]):
+            results = [item["id"] in self._items for item in items]
+            if atomic and not all(results):
+                return results
+            for item, ok in zip(items, results):
+                if ok:
+                    self.update(item["id"], item)
+            return results
+
+    def delete_many(self, item_ids, atomic=False):
+        unique = list(dict.fromkeys(item_ids))
+        with self._locked(unique):
+            if atomic and not all(item_id in self._items for item_id in unique):
+                return [item_id in self._items for item_id in item_ids]
+            deleted = {item_id: self.delete(item_id) is not None for item_id in unique}
+            return [deleted[item_id] for item_id in item_ids]
+
+    def count(self):
+        return len(self._items)
+
+    def find_by_name(self, name):
+        with self._lock:
+            return [self._items[i] for i in sorted(self._by_name.get(name, ()))]
+
+    def _price_slice(self, min_price, max_price):
+        lo = 0
+        if min_price is not None:
+            lo = bisect.bisect_left(self._by_price, (min_price, float("-inf")))
+        hi = len(self._by_price)
+        if max_price is not None:
+            hi = bisect.bisect_right(self._by_price, (max_price, float("inf")))
+        return [item_id for _, item_id in self._by_price[lo:hi]]
+
+    def find_by_price(self, min_price=None, max_price=None):
+        with self._lock:
+            ids = self._price_slice(min_price, max_price)
+            return [self._items[item_id] for item_id in ids]
+
+    def search(
+        self,
+        min_price=None,
+        max_price=None,
+        prefix=None,
+        contains=None,
+        sort="id",
+        descending=False,
+        limit=100,
+    ):
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Cannot sort by {sort}")
+        with self._lock:
+            # Start from the most selective index; a price slice, the name
+            # order and the id list are already in sort order for their field,
+            # so they are walked (backwards if descending) without sorting.
+            if prefix:
+                ids = self._trie.ids(prefix)
+                ordered = False
+            elif min_price is not None or max_price is not None or sort == "price":
+                ids = self._price_slice(min_price, max_price)
+                ordered = sort == "price"
+            elif sort == "name":
+                ids = [item_id for _, item_id in self._by_name_order]
+                ordered = True
+            else:
+                ids = self._ids
+                ordered = sort == "id"
+            if ordered and descending:
+                ids = reversed(ids)
+            items = (self._items[item_id] for item_id in ids)
+            if prefix and (min_price is not None or max_price is not None):
+                low = float("-inf") if min_price is None else min_price
+                high = float("inf") if max_price is None else max_price
+                items = (item for item in items if low <= item["price"] <= high)
+            if contains:
+                items = (item for item in items if contains in item["name"])
+
+            if not ordered:
+                items = sorted(
+                    items, key=lambda item: (item[sort], item["id"]), reverse=descending
+                )
+            return list(itertools.islice(items, limit))
+
+
+class SQLiteItemStore(ItemStore):
+    """Embedded SQLite backend in WAL mode, shared by all workers on a host"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS items (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            description TEXT,
+            price REAL NOT NULL,
+            version INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_items_name ON items (name);
+        CREATE INDEX IF NOT EXISTS idx_items_price ON items (price);
+
+        -- Collection version, bumped by triggers so that writes from every
+        -- worker process (and the bulk paths) are counted.
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER);
+        INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+        CREATE TRIGGER IF NOT EXISTS items_version_insert AFTER INSERT ON items
+        BEGIN
+            UPDATE meta SET value = value + 1 WHERE key = 'version';
+            UPDATE items SET version = (SELECT value FROM meta WHERE key = 'version')
+                WHERE id = NEW.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS items_version_update
+            AFTER UPDATE OF name, description, price ON items
+        BEGIN
+            UPDATE meta SET value = value + 1 WHERE key = 'version';
+            UPDATE items SET version = (SELECT value FROM meta WHERE key = 'version')
+                WHERE id = NEW.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS items_version_delete AFTER DELETE ON items
+        BEGIN
+            UPDATE meta SET value = value + 1 WHERE key = 'version';
+        END;
+    """
+
+    COLUMNS = "id, name, description, price"
+
+    def __init__(self, path: str, busy_timeout_ms: int = 5000):
+        self.path = path
+        self.busy_timeout_ms = int(busy_timeout_ms)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connections = []
+        # Each thread gets its own connection so that readers run in
+        # parallel (sqlite3 releases the GIL) and writers are serialized by
+        # SQLite itself. A private in-memory database only exists on one
+        # connection, so that case shares a single locked connection.
+        self._shared = self._connect() if path == ":memory:" else None
+        with self._connection() as conn:
+            self._migrate(conn)
+            conn.executescript(self.SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {self.busy_timeout_ms}")
+        if self.path != ":memory:":
+            conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """This thread's connection"""
+        if self._shared is not None:
+            with self._lock:
+                yield self._shared
+            return
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        yield conn
+
+    @contextmanager
+    def _transaction(self):
+        """This thread's connection inside BEGIN IMMEDIATE ... COMMIT"""
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    @staticmethod
+    def _migrate(conn):
+        """Add columns introduced after a database file was created"""
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(items)")]
+        if columns and "version" not in columns:
+            conn.execute(
+                "ALTER TABLE items ADD COLUMN version INTEGER NOT NULL DEFAULT 0"
+            )
+
+    @staticmethod
+    def _row(row) -> Optional[Dict]:
+        return dict(row) if row is not None else None
+
+    def _query(self, sql, params=()):
+        with self._connection() as conn:
+            return [dict(row) for row in conn.execute(sql, params)]
+
+    def _scalar(self, sql, params=()):
+        with self._connection() as conn:
+            return conn.execute(sql, params).fetchone()[0]
+
+    def get(self, item_id):
+        with self._connection() as conn:
+            row = conn.execute(
+                f"SELECT {self.COLUMNS} FROM items WHERE id = ?", (item_id,)
+            ).fetchone()
+        return self._row(row)
+
+    def get_versioned(self, item_id):
+        with self._connection() as conn:
+            row = conn.execute(
+                f"SELECT {self.COLUMNS}, version FROM items WHERE id = ?", (item_id,)
+            ).fetchone()
+        if row is None:
+            return None, 0
+        item = dict(row)
+        return item, item.pop("version")
+
+    def version(self):
+        return self._scalar("SELECT value FROM meta WHERE key = 'version'")
+
+    def list(self):
+        return self._query(f"SELECT {self.COLUMNS} FROM items ORDER BY id")
+
+    def page(self, after=None, limit=100):
+        if after is None:
+            return self._query(
+                f"SELECT {self.COLUMNS} FROM items ORDER BY id LIMIT ?", (limit,)
+            )
+        return self._query(
+            f"SELECT {self.COLUMNS} FROM items WHERE id > ? ORDER BY id LIMIT ?",
+            (after, limit),
+        )
+
+    def create(self, item):
+        with self._connection() as conn:
+            cursor = conn.execute(
+                f"INSERT OR IGNORE INTO items ({self.COLUMNS}) VALUES (?, ?, ?, ?)",
+                (item["id"], item["name"], item.get("description"), item["price"]),
+            )
+        return cursor.rowcount == 1
+
+    @staticmethod
+    def _current_version(conn, item_id):
+        row = conn.execute("SELECT version FROM items WHERE id = ?", (item_id,))
+        row = row.fetchone()
+        return None if row is None else row[0]
+
+    def update(self, item_id, item, expected_version=None):
+        sql = "UPDATE items SET name = ?, description = ?, price = ? WHERE id = ?"
+        params = [item["name"], item.get("description"), item["price"], item_id]
+        if expected_version is not None:
+            sql += " AND version = ?"
+            params.append(expected_version)
+        # The version is assigned by a trigger, so it is read back in the
+        # same transaction.
+        with self._transaction() as conn:
+            updated = conn.execute(sql, params).rowcount == 1
+            current = self._current_version(conn, item_id)
+        if not updated and current is not None:
+            raise VersionConflict(item_id, current)
+        return current
+
+    def delete(self, item_id, expected_version=None):
+        sql = "DELETE FROM items WHERE id = ?"
+        params = [item_id]
+        if expected_version is not None:
+            sql += " AND version = ?"
+            params.append(expected_version)
+        with self._transaction() as conn:
+            row = conn.execute(f"{sql} RETURNING {self.COLUMNS}", params).fetchone()
+            current = None if row is not None else self._current_version(conn, item_id)
+        if current is not None:
+            raise VersionConflict(item_id, current)
+        return self._row(row)
+
+    def _batch(self, sql, rows, atomic):
+        """Run ``sql`` once per row in a single transaction"""
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                results = [conn.execute(sql, row).rowcount == 1 for row in rows]
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("ROLLBACK" if atomic and not all(results) else "COMMIT")
+        return results
+
+    def create_many(self, items, atomic=False):
+        return self._batch(
+            f"INSERT OR IGNORE INTO items ({self.COLUMNS}) VALUES (?, ?, ?, ?)",
+            [(i["id"], i["name"], i.get("description"), i["price"]) for i in items],
+            atomic,
+        )
+
+    def update_many(self, items, atomic=False):
+        return self._batch(
+            "UPDATE items SET name = ?, description = ?, price = ? WHERE id = ?",
+            [(i["name"], i.get("description"), i["price"], i["id"]) for i in items],
+            atomic,
+        )
+
+    def delete_many(self, item_ids, atomic=False):
+        unique = list(dict.fromkeys(item_ids))
+        results = self._batch(
+            "DELETE FROM items WHERE id = ?",
+            [(item_id,) for item_id in unique],
+            atomic,
+        )
+        deleted = dict(zip(unique, results))
+        return [deleted[item_id] for item_id in item_ids]
+
+    def count(self):
+        return self._scalar("SELECT COUNT(*) FROM items")
+
+    def find_by_name(self, name):
+        return self._query(
+            f"SELECT {self.COLUMNS} FROM items WHERE name = ? ORDER BY id", (name,)
+        )
+
+    def find_by_price(self, min_price=None, max_price=None):
+        return self.search(min_price, max_price, sort="price", limit=None)
+
+    def search(
+        self,
+        min_price=None,
+        max_price=None,
+        prefix=None,
+        contains=None,
+        sort="id",
+        descending=False,
+        limit=100,
+    ):
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Cannot sort by {sort}")
+        clauses, params = [], []
+        if min_price is not None:
+            clauses.append("price >= ?")
+            params.append(min_price)
+        if max_price is not None:
+            clauses.append("price <= ?")
+            params.append(max_price)
+        if prefix:
+            # A range on the name index; UTF-8 byte order matches code point
+            # order, so this is exactly the names starting with prefix.
+            upper = _prefix_upper_bound(prefix)
+            if upper is None:
+                clauses.append("name >= ?")
+                params.append(prefix)
+            else:
+                clauses.append("name >= ? AND name < ?")
+                params += [prefix, upper]
+        if contains:
+            clauses.append("instr(name, ?) > 0")
+            params.append(contains)
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        direction = "DESC" if descending else "ASC"
+        sql = (
+            f"SELECT {self.COLUMNS} FROM items {where}"
+            f"ORDER BY {sort} {direction}, id {direction}"
+        )
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self._query(sql, params)
+
+    def size_bytes(self):
+        return self._scalar("PRAGMA page_count") * self._scalar("PRAGMA page_size")
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+
+def create_store(config) -> ItemStore:
+    """Build the item store selected by ``config.STORAGE_BACKEND``"""
+    backend = config.STORAGE_BACKEND.lower()
+    if backend == "memory":
+        return MemoryItemStore()
+    if backend == "sqlite":
+        return SQLiteItemStore(config.DATABASE_PATH)
+    raise ValueError(f"Unknown storage backend: {config.STORAGE_BACKEND}")
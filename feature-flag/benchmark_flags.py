@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark Feature Flag Evaluation (offline)
+
+Writes a synthetic flag file, serves it through the file provider and times
+compiling the snapshot and evaluating the flags for random users and
+tenants. No AWS access or network is needed.
+
+Usage:
+    python benchmark_flags.py
+    python benchmark_flags.py --flags 100 --evaluations 200000
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from flag_providers import FileFlagProvider
+from flag_rules import RuleEngine
+
+
+def make_flags(count, rng):
+    """Mix of literal flags, targeting rules and percentage rollouts"""
+    flags = {}
+    for i in range(count):
+        kind = i % 4
+        if kind == 0:
+            flags[f"flag-{i}"] = rng.choice(["on", "off"])
+        elif kind == 1:
+            flags[f"flag-{i}"] = {
+                "rules": [{"users": [f"user-{n}" for n in rng.sample(range(1000), 20)]}]
+            }
+        elif kind == 2:
+            flags[f"flag-{i}"] = {
+                "default": "off",
+                "rules": [{"percentage": rng.randint(1, 99), "value": "on"}],
+            }
+        else:
+            flags[f"flag-{i}"] = {
+                "rules": [
+                    {"tenants": ["tenant-1", "tenant-2"], "value": True},
+                    {"percentage": 50, "by": "tenant_id"},
+                ],
+                "environments": {"prod": {"enabled": False}},
+            }
+    return flags
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark feature flag evaluation")
+    parser.add_argument("--flags", type=int, default=40, help="Flags in the snapshot")
+    parser.add_argument("--evaluations", type=int, default=100_000, help="Single-flag evaluations")
+    parser.add_argument("--environment", default="dev")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    flags = make_flags(args.flags, rng)
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "flags.json")
+        with open(path, "w") as f:
+            json.dump(flags, f)
+
+        provider = FileFlagProvider(path, watch=False)
+        engine = RuleEngine(args.environment)
+
+        start = time.perf_counter()
+        compiled = engine.compile(provider.get_config())
+        compile_ms = (time.perf_counter() - start) * 1000
+
+        names = list(flags)
+        contexts = [
+            {"user_id": f"user-{rng.randrange(1000)}", "tenant_id": f"tenant-{rng.randrange(50)}"}
+            for _ in range(1000)
+        ]
+
+        start = time.perf_counter()
+        for i in range(args.evaluations):
+            compiled = engine.compile(provider.get_config())
+            compiled.evaluate(names[i % len(names)], contexts[i % len(contexts)])
+        single_us = (time.perf_counter() - start) / args.evaluations * 1e6
+
+        rounds = max(args.evaluations // len(names), 1)
+        start = time.perf_counter()
+        for i in range(rounds):
+            engine.compile(provider.get_config()).evaluate_all(contexts[i % len(contexts)])
+        all_us = (time.perf_counter() - start) / rounds * 1e6
+
+    print(f"Flags: {len(names)} ({args.environment})")
+    print(f"Compile snapshot:        {compile_ms:10.3f} ms")
+    print(f"Evaluate one flag:       {single_us:10.3f} us")
+    print(f"Evaluate all flags:      {all_us:10.3f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -28,6 +28,12 @@ ARCHITECTURE = "x86_64"
 # SSM Parameter name
 SSM_PARAMETER_NAME = os.getenv('SSM_PARAMETER_NAME', '/kognitos/dev/config')
 
+# Optional SSM hierarchy (e.g. /kognitos/dev) to load all flags from
+SSM_PARAMETER_PATH = os.getenv('SSM_PARAMETER_PATH', '')
+
+# Modules imported by the Lambda code, packaged next to lambda_function.py
+LAMBDA_MODULES = ['flag_client.py', 'flag_providers.py', 'flag_rules.py']
+
 # Read Lambda function code from file
 def get_lambda_code():
     """Read Lambda function code from lambda_function_simple_ssm.py"""
@@ -130,7 +136,8 @@ def create_lambda_role():
                     "Effect": "Allow",
                     "Action": [
                         "ssm:GetParameter",
-                        "ssm:GetParameters"
+                        "ssm:GetParameters",
+                        "ssm:GetParametersByPath"
                     ],
                     "Resource": f"arn:aws:ssm:{REGION}:*:parameter/kognitos/*"
                 }
@@ -164,6 +171,8 @@ def create_lambda_function(role_arn):
         with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
             # Lambda expects the file to be named lambda_function.py
             zip_file.writestr('lambda_function.py', lambda_code)
+            for module in LAMBDA_MODULES:
+                zip_file.write(module, module)
         zip_buffer.seek(0)
         return zip_buffer.read()
     
@@ -192,7 +201,8 @@ def create_lambda_function(role_arn):
                 FunctionName=FUNCTION_NAME,
                 Environment={
                     'Variables': {
-                        'SSM_PARAMETER_NAME': SSM_PARAMETER_NAME
+                        'SSM_PARAMETER_NAME': SSM_PARAMETER_NAME,
+                        'SSM_PARAMETER_PATH': SSM_PARAMETER_PATH
                     }
                 }
             )
@@ -232,7 +242,8 @@ def create_lambda_function(role_arn):
                     MemorySize=128,
                     Environment={
                         'Variables': {
-                            'SSM_PARAMETER_NAME': SSM_PARAMETER_NAME
+                            'SSM_PARAMETER_NAME': SSM_PARAMETER_NAME,
+                            'SSM_PARAMETER_PATH': SSM_PARAMETER_PATH
                         }
                     },
                     Architectures=[ARCHITECTURE]
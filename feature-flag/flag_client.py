@@ -0,0 +1,292 @@
+"""
+Cached Feature Flag Client for SSM Parameter Store
+
+Flags can come from one JSON parameter, a list of parameters (read with
+batched ``get_parameters`` calls of up to 10 names) or a whole hierarchy
+such as ``/kognitos/dev/`` (read with a paginated, recursive
+``get_parameters_by_path``). The parameters are merged into a single flag
+snapshot and always refreshed together:
+
+    - A parameter named ``config`` holds a JSON object of flags.
+    - Any other parameter holds one flag, named after the last segment of
+      its path; the value is parsed as JSON when possible (``true``, ``5``,
+      ``{...}``), otherwise kept as a string (``on``).
+    - Parameters are applied from the top of the hierarchy down, ``config``
+      objects before single flags at the same level, so
+      ``/kognitos/dev/textract/use-textract-ocr`` overrides the same flag in
+      ``/kognitos/dev/config``.
+
+Keeps the parsed flag configuration in memory so warm Lambda invocations
+don't pay an SSM round-trip (or count against SSM throttling limits) on every
+request:
+
+    - Within ``ttl`` seconds of the last fetch the cached config is returned.
+    - After that, for up to ``stale_ttl`` more seconds, the cached config is
+      still returned while a background thread fetches a fresh copy
+      (stale-while-revalidate).
+    - Older than that (e.g. an execution environment thawed after a long
+      idle period), the next call refreshes inline.
+
+If a fetch fails with a ClientError, a botocore error or invalid JSON, or a
+path holds no parameters, the last known good snapshot is kept as a whole
+and the fetch is retried after another ``ttl``. The ``default`` config is
+only used before any fetch has ever succeeded.
+
+Unless one is injected, the SSM client is created on the first fetch rather
+than at import (importing boto3 and building a client takes a few hundred
+milliseconds of cold start) and shared by every FlagClient of the process
+for the region, so warm invocations reuse its HTTP connections. It fails
+fast and retries throttling with backoff (``CLIENT_CONFIG``).
+
+Lambda freezes the execution environment between invocations, so a
+background refresh started near the end of one invocation may complete at
+the start of the next; the cached config is served meanwhile.
+
+The SSM client can be injected, which makes the client testable with a
+``botocore.stub.Stubber`` (stubbing the shared ``get_ssm_client()`` works
+too):
+
+    ssm = boto3.client('ssm', region_name='us-west-2')
+    with Stubber(ssm) as stubber:
+        stubber.add_response('get_parameter', {...}, {'Name': '/kognitos/dev/config'})
+        client = FlagClient('/kognitos/dev/config', ssm_client=ssm,
+                            background_refresh=False)
+        client.get_config()
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+from flag_providers import FlagProvider
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 30
+DEFAULT_STALE_TTL = 300
+
+FETCH_ERRORS = (ClientError, BotoCoreError, ValueError)
+
+# Most names a single get_parameters call accepts
+GET_PARAMETERS_BATCH = 10
+
+CONFIG_PARAMETER = 'config'
+
+# botocore Config options of the shared SSM client
+CLIENT_CONFIG = {
+    'connect_timeout': 2,
+    'read_timeout': 3,
+    'retries': {'mode': 'standard', 'max_attempts': 3},
+    'tcp_keepalive': True,
+    'max_pool_connections': 4,
+}
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_ssm_client(region_name=None):
+    """SSM client shared by the process for ``region_name``, created on first use"""
+    client = _clients.get(region_name)
+    if client is not None:
+        return client
+    with _clients_lock:
+        client = _clients.get(region_name)
+        if client is None:
+            import boto3
+            from botocore.config import Config
+
+            client = boto3.client(
+                'ssm', region_name=region_name, config=Config(**CLIENT_CONFIG)
+            )
+            _clients[region_name] = client
+        return client
+
+
+def _parse_value(value):
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def merge_parameters(parameters):
+    """Merge SSM parameter dicts (``Name``, ``Value``) into one flag snapshot"""
+    def order(parameter):
+        segments = parameter['Name'].strip('/').split('/')
+        return (len(segments), segments[-1] != CONFIG_PARAMETER, parameter['Name'])
+
+    snapshot = {}
+    for parameter in sorted(parameters, key=order):
+        leaf = parameter['Name'].rstrip('/').rsplit('/', 1)[-1]
+        if leaf == CONFIG_PARAMETER:
+            flags = json.loads(parameter['Value'])
+            if not isinstance(flags, dict):
+                raise ValueError(f"{parameter['Name']} is not a JSON object")
+            snapshot.update(flags)
+        else:
+            snapshot[leaf] = _parse_value(parameter['Value'])
+    return snapshot
+
+
+def snapshot_version(parameters):
+    """Short digest of the names and versions of the parameters read"""
+    digest = hashlib.sha1()
+    for name, version in sorted((p['Name'], p.get('Version', 0)) for p in parameters):
+        digest.update(f"{name}:{version}\n".encode())
+    return digest.hexdigest()[:12]
+
+
+class FlagClient(FlagProvider):
+    """TTL-cached reader of a flag snapshot stored in SSM (the 'ssm' provider)
+
+    Give exactly one of ``parameter_name`` (a single JSON parameter),
+    ``names`` (several parameters) or ``path`` (a hierarchy).
+    """
+
+    def __init__(self, parameter_name=None, ssm_client=None, ttl=DEFAULT_TTL,
+                 stale_ttl=DEFAULT_STALE_TTL, default=None, region_name=None,
+                 background_refresh=True, clock=time.monotonic, names=None,
+                 path=None):
+        if sum(source is not None for source in (parameter_name, names, path)) != 1:
+            raise ValueError("Give exactly one of parameter_name, names or path")
+        self.parameter_name = parameter_name
+        self.names = list(names) if names is not None else None
+        self.path = (path.rstrip('/') or '/') if path is not None else None
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.default = default if default is not None else {}
+        self.region_name = region_name
+        self.background_refresh = background_refresh
+        self.clock = clock
+
+        self._ssm_client = ssm_client
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._config = None
+        self._fetched_at = None
+        self._failed_at = None
+        self.version = None
+        self.last_error = None
+
+    @property
+    def ssm_client(self):
+        """SSM client, created on first use unless one was injected"""
+        if self._ssm_client is None:
+            self._ssm_client = get_ssm_client(self.region_name)
+        return self._ssm_client
+
+    @property
+    def source(self):
+        """What this client reads, for log messages"""
+        if self.path is not None:
+            return f"{self.path}/*"
+        if self.names is not None:
+            return ', '.join(self.names)
+        return self.parameter_name
+
+    def _read_parameters(self):
+        """Every parameter of the snapshot, in as few SSM calls as possible"""
+        ssm = self.ssm_client
+        if self.path is not None:
+            parameters = []
+            paginator = ssm.get_paginator('get_parameters_by_path')
+            for page in paginator.paginate(Path=self.path, Recursive=True):
+                parameters.extend(page['Parameters'])
+            if not parameters:
+                raise ValueError(f"No parameters found under {self.path}")
+            return parameters
+
+        if self.names is not None:
+            parameters = []
+            for start in range(0, len(self.names), GET_PARAMETERS_BATCH):
+                response = ssm.get_parameters(
+                    Names=self.names[start:start + GET_PARAMETERS_BATCH]
+                )
+                parameters.extend(response['Parameters'])
+                if response.get('InvalidParameters'):
+                    logger.warning("Flag parameters not found: %s",
+                                   ', '.join(response['InvalidParameters']))
+            if not parameters:
+                raise ValueError(f"None of the parameters exist: {self.source}")
+            return parameters
+
+        response = ssm.get_parameter(Name=self.parameter_name)
+        parameter = response['Parameter']
+        if not isinstance(json.loads(parameter['Value']), dict):
+            raise ValueError(f"{self.parameter_name} is not a JSON object")
+        # A single parameter is the whole config, whatever its name
+        return [{**parameter, 'Name': f"/{CONFIG_PARAMETER}"}]
+
+    def _fetch(self):
+        """Read and merge the parameters; returns (config, version)"""
+        parameters = self._read_parameters()
+        return merge_parameters(parameters), snapshot_version(parameters)
+
+    def refresh(self):
+        """Fetch the config now; returns the config in effect afterwards"""
+        try:
+            config, version = self._fetch()
+        except FETCH_ERRORS as e:
+            with self._lock:
+                self.last_error = e
+                self._failed_at = self.clock()
+                if self._config is not None:
+                    # Don't retry until another ttl has passed
+                    self._fetched_at = self._failed_at
+                    logger.warning("Flag refresh failed, keeping last known good config: %s", e)
+                    return self._config
+            logger.error("Flag fetch failed, using default config: %s", e)
+            return self.default
+
+        with self._lock:
+            self._config = config
+            self._fetched_at = self.clock()
+            self._failed_at = None
+            self.version = version
+            self.last_error = None
+        logger.debug("Fetched %s (version %s)", self.source, version)
+        return config
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _start_refresh(self):
+        """Start a background refresh unless one is already running"""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        if not self.background_refresh:
+            self._refresh_in_background()
+            return
+        threading.Thread(
+            target=self._refresh_in_background, name='flag-refresh', daemon=True
+        ).start()
+
+    def get_config(self):
+        """Current flag configuration (shared; treat it as read-only)"""
+        now = self.clock()
+        with self._lock:
+            config, fetched_at, failed_at = self._config, self._fetched_at, self._failed_at
+
+        if config is None:
+            if failed_at is not None and now - failed_at < self.ttl:
+                return self.default
+            return self.refresh()
+
+        age = now - fetched_at
+        if age < self.ttl:
+            return config
+        if age >= self.ttl + self.stale_ttl:
+            return self.refresh()
+        self._start_refresh()
+        return config
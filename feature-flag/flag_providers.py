@@ -0,0 +1,194 @@
+"""
+Feature Flag Providers
+
+A provider returns the current flag snapshot from ``get_config()``. It keeps
+returning the same dict until the flags change, so a ``RuleEngine`` compiles
+each snapshot only once. ``version`` identifies the snapshot.
+
+    ssm     FlagClient (flag_client.py): cached SSM reads, needs boto3
+    file    FileFlagProvider: a local JSON file, reloaded when it changes
+    static  StaticFlagProvider: a fixed dict, e.g. in tests
+
+The file provider needs no network or AWS credentials, so services, tests
+and benchmarks can evaluate flags offline. Changes are picked up through
+watchdog (inotify on Linux) when it is installed, otherwise by checking the
+file's modification time at most every ``poll_interval`` seconds. Write
+the file atomically (write a temporary file, then rename it over the old
+one) so a reload never sees half a file; an unreadable or invalid file
+keeps the last good snapshot.
+
+    provider = create_provider('file', file_path='flags.json')
+    provider.get_config()
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL = 1.0
+
+# Watchdog events that can change a file's content. Reading the file
+# raises "opened"/"closed_no_write" events, which must not trigger reloads.
+RELOAD_EVENTS = ('created', 'modified', 'moved', 'closed')
+
+
+class FlagProvider(ABC):
+    """Source of flag snapshots"""
+
+    version = None
+
+    @abstractmethod
+    def get_config(self):
+        """Current flag snapshot (shared; treat it as read-only)"""
+
+    def get(self, flag, default=None):
+        """Value of one flag from the current snapshot"""
+        return self.get_config().get(flag, default)
+
+    def close(self):
+        """Release background resources"""
+
+
+class StaticFlagProvider(FlagProvider):
+    """Provider of a fixed snapshot"""
+
+    def __init__(self, config=None):
+        self.config = config if config is not None else {}
+        self.version = 'static'
+
+    def get_config(self):
+        return self.config
+
+
+class _ReloadHandler:
+    """Watchdog event handler calling ``reload`` for changes to one file"""
+
+    def __init__(self, file_path, reload):
+        self.file_path = file_path
+        self.reload = reload
+
+    def dispatch(self, event):
+        if event.is_directory or event.event_type not in RELOAD_EVENTS:
+            return
+        paths = (event.src_path, getattr(event, 'dest_path', None))
+        if any(path and os.path.abspath(path) == self.file_path for path in paths):
+            self.reload()
+
+
+class FileFlagProvider(FlagProvider):
+    """Flags from a local JSON file, hot-reloaded on change"""
+
+    def __init__(self, file_path, default=None, watch=True,
+                 poll_interval=DEFAULT_POLL_INTERVAL, clock=time.monotonic):
+        self.file_path = os.path.abspath(file_path)
+        self.default = default if default is not None else {}
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.last_error = None
+
+        self._lock = threading.Lock()
+        self._config = None
+        self._mtime = None
+        self._checked_at = None
+        self._observer = None
+
+        self.reload()
+        if watch:
+            self._start_watching()
+
+    def _start_watching(self):
+        # Imported here: watchdog is optional and slow to import, which
+        # would add to Lambda cold starts
+        try:
+            from watchdog.observers import Observer
+        except ImportError:
+            return
+        # Watch the directory: editors and atomic writes replace the file
+        directory = os.path.dirname(self.file_path)
+        try:
+            observer = Observer()
+            observer.schedule(_ReloadHandler(self.file_path, self.reload), directory)
+            observer.daemon = True
+            observer.start()
+        except OSError as e:
+            logger.warning("Cannot watch %s, polling instead: %s", directory, e)
+            return
+        self._observer = observer
+
+    def reload(self):
+        """Re-read the file; returns whether the snapshot changed"""
+        mtime = None
+        try:
+            mtime = os.stat(self.file_path).st_mtime_ns
+            with open(self.file_path, 'rb') as f:
+                content = f.read()
+            config = json.loads(content)
+            if not isinstance(config, dict):
+                raise ValueError(f"{self.file_path} is not a JSON object")
+        except (OSError, ValueError) as e:
+            with self._lock:
+                # Not retried by polling until the file changes again
+                self._mtime = mtime
+                self.last_error = e
+                self._checked_at = self.clock()
+            logger.warning("Cannot load flags from %s, keeping current flags: %s",
+                           self.file_path, e)
+            return False
+
+        version = hashlib.sha1(content).hexdigest()[:12]
+        with self._lock:
+            self._mtime = mtime
+            self._checked_at = self.clock()
+            self.last_error = None
+            if version == self.version:
+                return False
+            self._config = config
+            self.version = version
+        logger.info("Loaded flags from %s (version %s)", self.file_path, version)
+        return True
+
+    def _poll(self):
+        """Reload if the file's modification time changed"""
+        now = self.clock()
+        if self._checked_at is not None and now - self._checked_at < self.poll_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.file_path).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self.reload()
+
+    def get_config(self):
+        if self._observer is None:
+            self._poll()
+        config = self._config
+        return config if config is not None else self.default
+
+    def close(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+
+
+def create_provider(kind, **options):
+    """Provider of the given kind ('ssm', 'file' or 'static')
+
+    Options are passed to the provider's constructor.
+    """
+    if kind == 'ssm':
+        from flag_client import FlagClient
+        return FlagClient(**options)
+    if kind == 'file':
+        return FileFlagProvider(**options)
+    if kind == 'static':
+        return StaticFlagProvider(**options)
+    raise ValueError(f"Unknown flag provider: {kind}")
@@ -0,0 +1,191 @@
+"""
+Feature Flag Rule Engine
+
+Flag values in the flag snapshot are either literals, as before:
+
+    {"use-textract-ocr": "on", "ocr-limits": {"pages": 50}}
+
+or rule definitions, which are objects with a ``rules`` key (use
+``"rules": []`` for a flag that only has a ``default``). Objects without
+``rules`` are plain values and are returned as they are:
+
+    {
+        "use-textract-ocr": {
+            "default": "off",
+            "rules": [
+                {"users": ["alice", "bob"], "value": "on"},
+                {"tenants": ["acme"], "percentage": 25, "by": "user_id", "value": "on"}
+            ],
+            "environments": {
+                "prod": {"rules": [{"tenants": ["acme"], "value": "on"}]}
+            }
+        }
+    }
+
+Rules are tried in order and the first match wins; if none matches, or
+``enabled`` is false, the flag evaluates to ``default`` (``false`` if not
+given). A rule matches when all of its conditions hold:
+
+    users        the context's ``user_id`` is in the list
+    tenants      the context's ``tenant_id`` is in the list
+    percentage   the context attribute named by ``by`` (default ``user_id``)
+                 hashes into the first ``percentage`` of 10000 buckets
+
+A rule's ``value`` defaults to ``true``. Buckets come from a SHA-1 of
+``<salt>:<id>`` with ``salt`` defaulting to the flag name, so a given user
+stays in (or out of) a rollout as the percentage grows, and different flags
+roll out to independent sets of users. ``environments`` entries replace the
+keys they name for that environment only.
+
+Definitions are compiled once per snapshot into closures; evaluating a flag
+is then a few set lookups, with at most one hash per percentage rule.
+Only the standard library is used, so the module can be imported by the
+Lambda and by the application alike.
+"""
+
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = 10000
+
+# Flag values that mean "enabled" for is_enabled()
+ON_VALUES = (True, 'on')
+
+RULE_KEYS = {'users', 'tenants', 'percentage', 'by', 'value'}
+DEFINITION_KEYS = {'enabled', 'default', 'rules', 'salt', 'environments'}
+
+# Key that makes an object-valued flag a rule definition
+RULES_MARKER = 'rules'
+
+
+def bucket(salt, unit_id):
+    """Deterministic bucket in [0, BUCKETS) for an id"""
+    digest = hashlib.sha1(f"{salt}:{unit_id}".encode()).digest()
+    return int.from_bytes(digest[:4], 'big') % BUCKETS
+
+
+def _attribute(context, key):
+    """Context attribute as a string, None if missing"""
+    value = context.get(key)
+    return None if value is None else str(value)
+
+
+def _compile_rule(rule, salt):
+    """Compile one rule into (match(context) -> bool, value)"""
+    unknown = set(rule) - RULE_KEYS
+    if unknown:
+        raise ValueError(f"Unknown rule keys: {', '.join(sorted(unknown))}")
+
+    conditions = []
+    if 'users' in rule:
+        users = frozenset(str(user) for user in rule['users'])
+        conditions.append(lambda context: _attribute(context, 'user_id') in users)
+    if 'tenants' in rule:
+        tenants = frozenset(str(tenant) for tenant in rule['tenants'])
+        conditions.append(lambda context: _attribute(context, 'tenant_id') in tenants)
+    if 'percentage' in rule:
+        percentage = float(rule['percentage'])
+        if not 0 <= percentage <= 100:
+            raise ValueError(f"percentage must be between 0 and 100, got {percentage}")
+        threshold = int(percentage * BUCKETS / 100)
+        by = rule.get('by', 'user_id')
+
+        def in_rollout(context):
+            unit_id = context.get(by)
+            return unit_id is not None and bucket(salt, unit_id) < threshold
+        conditions.append(in_rollout)
+
+    value = rule.get('value', True)
+    if not conditions:
+        return (lambda context: True), value
+    if len(conditions) == 1:
+        return conditions[0], value
+    conditions = tuple(conditions)
+    return (lambda context: all(condition(context) for condition in conditions)), value
+
+
+def compile_flag(name, definition, environment=None):
+    """Compile a flag definition into evaluate(context) -> value"""
+    if not isinstance(definition, dict) or RULES_MARKER not in definition:
+        return lambda context: definition
+
+    overrides = definition.get('environments', {}).get(environment)
+    if overrides:
+        definition = {**definition, **overrides}
+    unknown = set(definition) - DEFINITION_KEYS
+    if unknown:
+        raise ValueError(f"Unknown keys: {', '.join(sorted(unknown))}")
+
+    default = definition.get('default', False)
+    if not definition.get('enabled', True):
+        return lambda context: default
+
+    salt = definition.get('salt', name)
+    rules = tuple(_compile_rule(rule, salt) for rule in definition.get('rules', ()))
+    if not rules:
+        return lambda context: default
+
+    def evaluate(context):
+        for match, value in rules:
+            if match(context):
+                return value
+        return default
+    return evaluate
+
+
+class CompiledFlags:
+    """Evaluators for every flag of one snapshot"""
+
+    def __init__(self, config, environment=None):
+        self.environment = environment
+        self.evaluators = {}
+        self.errors = {}
+        for name, definition in config.items():
+            try:
+                self.evaluators[name] = compile_flag(name, definition, environment)
+            except (TypeError, ValueError, AttributeError) as e:
+                self.errors[name] = str(e)
+                logger.error("Invalid definition for flag %s: %s", name, e)
+
+    def evaluate(self, name, context=None, default=None):
+        """Value of flag ``name`` for ``context``; ``default`` if unknown or invalid"""
+        evaluator = self.evaluators.get(name)
+        if evaluator is None:
+            return default
+        return evaluator(context or {})
+
+    def is_enabled(self, name, context=None):
+        """Whether flag ``name`` is true or "on" for ``context``"""
+        return self.evaluate(name, context) in ON_VALUES
+
+    def evaluate_all(self, context=None):
+        """Values of every valid flag for ``context``"""
+        context = context or {}
+        return {name: evaluator(context) for name, evaluator in self.evaluators.items()}
+
+
+class RuleEngine:
+    """Compiles flag snapshots for one environment, once per snapshot
+
+    Flag clients return the same dict until they fetch a new snapshot, so
+    the compiled flags are reused for as long as ``config`` is that object.
+    """
+
+    def __init__(self, environment=None):
+        self.environment = environment
+        self._lock = threading.Lock()
+        self._compiled = (None, None)
+
+    def compile(self, config):
+        source, compiled = self._compiled
+        if source is config:
+            return compiled
+        with self._lock:
+            source, compiled = self._compiled
+            if source is not config:
+                compiled = CompiledFlags(config, self.environment)
+                self._compiled = (config, compiled)
+            return compiled
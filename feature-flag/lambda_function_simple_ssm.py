@@ -1,42 +1,90 @@
 import json
-import boto3
+import logging
 import os
-from botocore.exceptions import ClientError
+from flag_providers import create_provider
+from flag_rules import ON_VALUES, RuleEngine
 
-# Initialize SSM client
-ssm_client = boto3.client('ssm', region_name='us-west-2')
+# The Lambda runtime attaches a handler to the root logger; set
+# LOG_LEVEL=DEBUG to log the config read on every invocation
+logger = logging.getLogger()
+logger.setLevel(os.getenv('LOG_LEVEL', 'INFO'))
+
+# Region of the SSM client, which is created on the first fetch (boto3 is
+# only imported then) and reused by every warm invocation
+REGION = os.getenv('AWS_REGION', 'us-west-2')
 
 # SSM Parameter name
 PARAMETER_NAME = os.getenv('SSM_PARAMETER_NAME', '/kognitos/dev/config')
 
+# When set (e.g. /kognitos/dev), every parameter under this path is loaded
+# and merged into one flag snapshot instead of reading PARAMETER_NAME only
+PARAMETER_PATH = os.getenv('SSM_PARAMETER_PATH')
+
+# Where flags come from: 'ssm', or 'file' to read FLAG_FILE (no AWS calls)
+FLAG_PROVIDER = os.getenv('FLAG_PROVIDER', 'ssm')
+FLAG_FILE = os.getenv('FLAG_FILE', 'flags.json')
+
+# Seconds a fetched config is served before it is refreshed in the background
+FLAG_CACHE_TTL = float(os.getenv('FLAG_CACHE_TTL', '30'))
+
+# Used only until the parameter has been read successfully once
+DEFAULT_CONFIG = {"use-textract-ocr": "off"}
+
+# Shared across warm invocations of this execution environment
+if FLAG_PROVIDER == 'file':
+    flag_provider = create_provider('file', file_path=FLAG_FILE, default=DEFAULT_CONFIG)
+else:
+    flag_provider = create_provider(
+        'ssm',
+        parameter_name=None if PARAMETER_PATH else PARAMETER_NAME,
+        path=PARAMETER_PATH or None,
+        region_name=REGION,
+        ttl=FLAG_CACHE_TTL,
+        default=DEFAULT_CONFIG
+    )
+
+# Flag definitions are compiled once per snapshot, with this environment's overrides
+FLAG_ENVIRONMENT = os.getenv('FLAG_ENVIRONMENT', 'dev')
+rule_engine = RuleEngine(FLAG_ENVIRONMENT)
+
+# Read the flags during the init phase, before the first invocation (useful
+# with provisioned concurrency, whose init runs ahead of traffic)
+if os.getenv('FLAG_PREFETCH', 'false').lower() == 'true':
+    flag_provider.get_config()
+
+# Event keys used for user/tenant targeting and percentage rollouts
+CONTEXT_KEYS = ('user_id', 'tenant_id')
+
 def get_configuration():
-    """Retrieve configuration directly from SSM Parameter Store"""
-    try:
-        response = ssm_client.get_parameter(Name=PARAMETER_NAME)
-        config_value = response['Parameter']['Value']
-        
-        # Parse JSON
-        config = json.loads(config_value)
-        print(f"Retrieved config from SSM: {json.dumps(config)}")
-        
-        return config
-    except ClientError as e:
-        print(f"Error retrieving SSM parameter: {e}")
-        return {"use-textract-ocr": "off"}
-    except json.JSONDecodeError as e:
-        print(f"Error parsing JSON: {e}")
-        return {"use-textract-ocr": "off"}
+    """Retrieve configuration from the flag provider (cached between invocations)"""
+    config = flag_provider.get_config()
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Retrieved config from %s: %s", FLAG_PROVIDER, json.dumps(config))
+    return config
+
+def flag_context(event):
+    """Targeting attributes from the event or its query string"""
+    event = event if isinstance(event, dict) else {}
+    params = event.get('queryStringParameters') or {}
+    attributes = {}
+    for key in CONTEXT_KEYS:
+        value = event.get(key, params.get(key))
+        if value is not None:
+            attributes[key] = value
+    return attributes
 
 def lambda_handler(event, context):
     """Lambda handler"""
     try:
-        # Get configuration directly from SSM
+        # Get configuration (cached between invocations)
         config = get_configuration()
+        flags = rule_engine.compile(config)
         
-        # Evaluate the feature flag
-        use_textract = config.get('use-textract-ocr', 'off')
+        # Evaluate the feature flag for the caller
+        use_textract = flags.evaluate('use-textract-ocr', flag_context(event), 'off')
+        enabled = use_textract in ON_VALUES
         
-        if use_textract == 'on':
+        if enabled:
             message = "Textract OCR is ENABLED."
         else:
             message = "Textract OCR is DISABLED."
@@ -46,13 +94,13 @@ def lambda_handler(event, context):
             'body': json.dumps({
                 'feature_status': message,
                 'config_data': config,
-                'feature_flag': use_textract == 'on',
+                'feature_flag': enabled,
                 'use_textract_ocr': use_textract
             })
         }
     
     except Exception as e:
-        print(f"Error: {e}")
+        logger.exception("Error: %s", e)
         return {
             'statusCode': 500,
             'body': json.dumps({'error': str(e)})
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Cold Start Profile of the Flag Lambda
+
+Runs the handler in fresh Python processes, the way Lambda starts a new
+execution environment, and reports:
+
+    1. Import time of lambda_function_simple_ssm (``python -X importtime``),
+       with the slowest modules.
+    2. Time to create the shared SSM client (import boto3, build the client).
+       No request is sent, so no AWS access is needed.
+    3. Handler import, first (cold) and second (warm) invocation, median of
+       several runs.
+
+By default flags come from a temporary local file (FLAG_PROVIDER=file) so
+the profile runs offline; ``--provider ssm`` reads the real parameter and
+needs AWS credentials.
+
+Usage:
+    python profile_cold_start.py
+    python profile_cold_start.py --runs 10 --top 20
+    python profile_cold_start.py --provider ssm
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HANDLER_MODULE = "lambda_function_simple_ssm"
+
+# Runs in the child process; prints phase timings in ms as JSON
+PHASES_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import {module} as handler
+imported = time.perf_counter()
+handler.lambda_handler({{}}, None)
+cold = time.perf_counter()
+handler.lambda_handler({{}}, None)
+warm = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - start) * 1000,
+    "first_invocation_ms": (cold - imported) * 1000,
+    "warm_invocation_ms": (warm - cold) * 1000,
+}}))
+"""
+
+CLIENT_SCRIPT = """
+import json, time
+from flag_client import get_ssm_client
+start = time.perf_counter()
+get_ssm_client({region!r})
+created = time.perf_counter()
+get_ssm_client({region!r})
+print(json.dumps({{
+    "create_client_ms": (created - start) * 1000,
+    "shared_client_ms": (time.perf_counter() - created) * 1000,
+}}))
+"""
+
+
+def print_info(message):
+    print(f"[INFO] {message}")
+
+
+def print_error(message):
+    print(f"[ERROR] {message}")
+
+
+def run_python(args, env):
+    result = subprocess.run(
+        [sys.executable] + args, cwd=HERE, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else "failed")
+    return result
+
+
+def import_times(env):
+    """(self us, cumulative us, module) for every module the handler imports"""
+    result = run_python(["-X", "importtime", "-c", f"import {HANDLER_MODULE}"], env)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, module = line[len("import time:"):].split("|")
+        rows.append((int(own), int(cumulative), module.strip()))
+    return rows
+
+
+def median_phases(script, env, runs):
+    samples = [json.loads(run_python(["-c", script], env).stdout.strip().splitlines()[-1])
+               for _ in range(runs)]
+    return {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the flag Lambda's cold start")
+    parser.add_argument("--provider", choices=["file", "ssm"], default="file")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per phase")
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to list")
+    args = parser.parse_args()
+
+    env = dict(os.environ, FLAG_PROVIDER=args.provider, PYTHONDONTWRITEBYTECODE="")
+    env.setdefault("AWS_REGION", "us-west-2")
+    workdir = tempfile.mkdtemp(prefix="flag-profile-")
+    flag_file = os.path.join(workdir, "flags.json")
+    with open(flag_file, "w") as f:
+        json.dump({"use-textract-ocr": "off"}, f)
+    env["FLAG_FILE"] = flag_file
+
+    try:
+        print_info(f"Python {sys.version.split()[0]}, provider={args.provider}, runs={args.runs}")
+        rows = import_times(env)
+        handler = next((row for row in rows if row[2] == HANDLER_MODULE), None)
+        print(f"\nImport of {HANDLER_MODULE}: "
+              f"{handler[1] / 1000 if handler else 0:.1f} ms ({len(rows)} modules)")
+        print(f"\n{'self ms':>9} {'cumulative ms':>14}  module")
+        for own, cumulative, module in sorted(rows, reverse=True)[:args.top]:
+            print(f"{own / 1000:>9.1f} {cumulative / 1000:>14.1f}  {module}")
+
+        client = median_phases(CLIENT_SCRIPT.format(region=env["AWS_REGION"]), env, args.runs)
+        print(f"\nSSM client: created in {client['create_client_ms']:.1f} ms "
+              f"(on the first SSM fetch), then shared ({client['shared_client_ms']:.3f} ms)")
+
+        phases = median_phases(PHASES_SCRIPT.format(module=HANDLER_MODULE), env, args.runs)
+        print("\nHandler (median):")
+        print(f"  import            {phases['import_ms']:10.1f} ms")
+        print(f"  first invocation  {phases['first_invocation_ms']:10.1f} ms")
+        print(f"  warm invocation   {phases['warm_invocation_ms']:10.3f} ms")
+    except RuntimeError as e:
+        print_error(f"Profiling run failed: {e}")
+        sys.exit(1)
+    finally:
+        os.remove(flag_file)
+        os.rmdir(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,18 +10,30 @@ Prerequisites:
     - boto3 installed (pip install boto3)
     - IAM permissions for SSM
 
+Flags live under /kognitos/<env>/: the shared JSON config in
+/kognitos/<env>/config, plus optional per-service flags in their own
+parameters, e.g. /kognitos/<env>/textract/use-textract-ocr. A Lambda with
+SSM_PARAMETER_PATH=/kognitos/<env> loads them all as one snapshot.
+
 Usage:
     python setup_simple_ssm.py
+    python setup_simple_ssm.py --env prod
+    python setup_simple_ssm.py --flag textract/use-textract-ocr=on
 """
 
+import argparse
 import boto3
 import json
 import sys
 from botocore.exceptions import ClientError
 
+from flag_client import merge_parameters
+
 # Configuration
 REGION = "us-west-2"
-PARAMETER_NAME = "/kognitos/dev/config"
+ENVIRONMENT = "dev"
+PARAMETER_PATH = f"/kognitos/{ENVIRONMENT}"
+PARAMETER_NAME = f"{PARAMETER_PATH}/config"
 
 # Simple feature flag - use Textract OCR on/off
 CONFIG_VALUE = {
@@ -43,8 +55,39 @@ def print_warning(message):
 # Initialize SSM client
 ssm_client = boto3.client('ssm', region_name=REGION)
 
-def create_ssm_parameter():
-    """Create SSM parameter with Textract OCR flag"""
+def put_parameter(name, value, description):
+    """Create or overwrite one String parameter"""
+    try:
+        ssm_client.get_parameter(Name=name)
+        print_warning(f"Parameter {name} already exists. Updating...")
+        
+        ssm_client.put_parameter(
+            Name=name,
+            Value=value,
+            Type="String",
+            Overwrite=True
+        )
+        print_success(f"Parameter updated: {name}")
+    except ssm_client.exceptions.ParameterNotFound:
+        # Create new parameter
+        ssm_client.put_parameter(
+            Name=name,
+            Value=value,
+            Type="String",
+            Description=description
+        )
+        print_success(f"Parameter created: {name}")
+
+def read_hierarchy():
+    """All parameters under PARAMETER_PATH, paginated"""
+    parameters = []
+    paginator = ssm_client.get_paginator('get_parameters_by_path')
+    for page in paginator.paginate(Path=PARAMETER_PATH, Recursive=True):
+        parameters.extend(page['Parameters'])
+    return parameters
+
+def create_ssm_parameter(flags=None):
+    """Create SSM parameter with Textract OCR flag, plus any per-service flags"""
     print(f"\n{'='*60}")
     print("Creating SSM Parameter for Textract OCR Feature Flag")
     print(f"{'='*60}\n")
@@ -52,37 +95,21 @@ def create_ssm_parameter():
     config_json = json.dumps(CONFIG_VALUE)
     
     try:
-        # Check if parameter exists
-        try:
-            ssm_client.get_parameter(Name=PARAMETER_NAME)
-            print_warning(f"Parameter {PARAMETER_NAME} already exists. Updating...")
-            
-            ssm_client.put_parameter(
-                Name=PARAMETER_NAME,
-                Value=config_json,
-                Type="String",
-                Overwrite=True
-            )
-            print_success(f"Parameter updated: {PARAMETER_NAME}")
-        except ssm_client.exceptions.ParameterNotFound:
-            # Create new parameter
-            ssm_client.put_parameter(
-                Name=PARAMETER_NAME,
-                Value=config_json,
-                Type="String",
-                Description="Textract OCR feature flag"
-            )
-            print_success(f"Parameter created: {PARAMETER_NAME}")
+        put_parameter(PARAMETER_NAME, config_json, "Textract OCR feature flag")
+        for name, value in (flags or {}).items():
+            put_parameter(f"{PARAMETER_PATH}/{name}", value, "Feature flag")
         
-        # Verify
-        response = ssm_client.get_parameter(Name=PARAMETER_NAME)
-        value = json.loads(response['Parameter']['Value'])
+        # Verify by loading the hierarchy the way the Lambda does
+        parameters = read_hierarchy()
+        value = merge_parameters(parameters)
         
         print(f"\n{'='*60}")
         print("✅ Setup Complete!")
         print(f"{'='*60}")
-        print(f"\nParameter: {PARAMETER_NAME}")
-        print(f"Value: {json.dumps(value, indent=2)}")
+        print(f"\nParameters under {PARAMETER_PATH}:")
+        for parameter in sorted(parameters, key=lambda p: p['Name']):
+            print(f"  {parameter['Name']} = {parameter['Value']}")
+        print(f"\nMerged flags: {json.dumps(value, indent=2)}")
         print(f"\nTo update the flag, use:")
         print(f"  .\\update-ssm-parameter.ps1")
         print(f"\nOr AWS CLI:")
@@ -91,11 +118,32 @@ def create_ssm_parameter():
         
         return True
         
-    except ClientError as e:
+    except (ClientError, ValueError) as e:
         print_error(f"Failed to create parameter: {e}")
         return False
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Create the SSM feature flag parameters")
+    parser.add_argument("--env", default=ENVIRONMENT, help="Environment (default: dev)")
+    parser.add_argument(
+        "--flag", action="append", default=[], metavar="NAME=VALUE",
+        help="Per-service flag to write under /kognitos/<env>/, e.g. textract/use-textract-ocr=on"
+    )
+    return parser.parse_args()
+
 def main():
+    global PARAMETER_PATH, PARAMETER_NAME
+    args = parse_args()
+    PARAMETER_PATH = f"/kognitos/{args.env}"
+    PARAMETER_NAME = f"{PARAMETER_PATH}/config"
+    flags = {}
+    for flag in args.flag:
+        name, sep, value = flag.partition("=")
+        if not sep or not name.strip("/"):
+            print_error(f"Invalid --flag {flag!r}, expected NAME=VALUE")
+            sys.exit(1)
+        flags[name.strip("/")] = value
+    
     print("=" * 60)
     print("Simple SSM Parameter Setup (No AppConfig)")
     print("=" * 60)
@@ -104,11 +152,12 @@ def main():
     print("No AppConfig Application, Environment, or Profile needed.")
     print()
     
-    if create_ssm_parameter():
+    if create_ssm_parameter(flags):
         print("\n✅ All done! Your Lambda can now read from SSM directly.")
         print("\nNext steps:")
         print("1. Update Lambda code to use lambda_function_simple_ssm.py")
-        print("2. Update Lambda IAM role to allow ssm:GetParameter")
+        print("2. Update Lambda IAM role to allow ssm:GetParameter and ssm:GetParametersByPath")
+        print(f"   (set SSM_PARAMETER_PATH={PARAMETER_PATH} to load every flag under the path)")
         print("3. Test your Lambda function")
     else:
         print("\n❌ Setup failed. Check errors above.")
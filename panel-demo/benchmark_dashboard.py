@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+dipTech Proprietary and Confidential
+Benchmark for the Sales KPI Dashboard data pipeline.
+
+Generates synthetic sales extracts with the same schema as sales_data.csv and
+times every stage the dashboard runs, headless (no Panel server needed):
+loading, cube build, filtering and each chart's aggregation.
+
+Peak memory is what tracemalloc sees (Python and NumPy allocations); Arrow
+allocates outside it, so parquet loads under-report. The process-wide max RSS
+is included in the JSON report.
+
+Usage:
+    python benchmark_dashboard.py                      # 10k, 1M and 10M rows
+    python benchmark_dashboard.py --rows 10000 1000000 --json results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from sales_cube import (
+    build_bitmap_index,
+    build_cube,
+    filter_cube,
+    kpis,
+    monthly_summary,
+    rollup,
+)
+from sales_loader import cache_path, load_data
+
+REGIONS = [
+    "Asia Pacific",
+    "Europe",
+    "Latin America",
+    "Middle East & Africa",
+    "North America",
+]
+PRODUCTS = [
+    "Cloud Subscription",
+    "Hardware",
+    "Professional Services",
+    "Software License",
+    "Support & Maintenance",
+]
+SALES_REPS = [
+    "Alice Johnson",
+    "Bob Smith",
+    "Carol Davis",
+    "David Wilson",
+    "Emma Brown",
+    "Frank Miller",
+    "Grace Lee",
+    "Henry Taylor",
+    "Ivy Chen",
+    "Jack Anderson",
+    "Kate Thompson",
+    "Liam Garcia",
+    "Maya Patel",
+    "Noah Martinez",
+    "Olivia White",
+]
+CUSTOMERS = [
+    "Apex Solutions",
+    "CloudTech Solutions",
+    "DataFlow Corp",
+    "Digital Ventures",
+    "Elite Systems",
+    "Enterprise Dynamics",
+    "Future Systems Inc",
+    "Global Solutions Ltd",
+    "Horizon Corp",
+    "Innovation Systems",
+    "NextGen Technologies",
+    "Pinnacle Corp",
+    "Prime Industries",
+    "Quantum Corp",
+    "Smart Analytics Co",
+    "Stellar Enterprises",
+    "Summit Technologies",
+    "TechCorp Inc",
+    "Vertex Solutions",
+    "Zenith Systems",
+]
+
+DEFAULT_ROWS = [10_000, 1_000_000, 10_000_000]
+
+# Filter states exercised by the filter benchmark: everything selected (the
+# dashboard's initial state), a single region, and a narrow selection.
+FILTER_STATES = {
+    "all": {
+        "years": [2022, 2023, 2024],
+        "regions": REGIONS,
+        "products": PRODUCTS,
+    },
+    "one_region": {"regions": ["Europe"]},
+    "narrow": {
+        "years": [2023, 2024],
+        "regions": ["Europe", "Asia Pacific"],
+        "products": ["Hardware", "Software License"],
+    },
+}
+
+
+# ---------------------------------------------------------------------
+# Synthetic data
+# ---------------------------------------------------------------------
+
+
+def generate_sales(rows, seed=0):
+    """Synthetic sales rows with the columns and value ranges of sales_data.csv."""
+    rng = np.random.default_rng(seed)
+    days = pd.date_range("2022-01-01", "2024-12-31", freq="D")
+    date = days[rng.integers(0, len(days), rows)].sort_values()
+
+    revenue = np.round(np.clip(rng.gamma(2.5, 14000, rows), 1000, 200000), 2)
+    margin = np.round(rng.uniform(20, 40, rows), 2)
+    profit = np.round(revenue * margin / 100, 2)
+    units = rng.integers(1, 20, rows)
+    iso = date.isocalendar()
+
+    return pd.DataFrame(
+        {
+            "date": date.strftime("%Y-%m-%d"),
+            "year": date.year,
+            "month": date.month,
+            "quarter": "Q" + date.quarter.astype(str),
+            "region": np.array(REGIONS)[rng.integers(0, len(REGIONS), rows)],
+            "product": np.array(PRODUCTS)[rng.integers(0, len(PRODUCTS), rows)],
+            "sales_rep": np.array(SALES_REPS)[rng.integers(0, len(SALES_REPS), rows)],
+            "customer": np.array(CUSTOMERS)[rng.integers(0, len(CUSTOMERS), rows)],
+            "revenue": revenue,
+            "cost": np.round(revenue - profit, 2),
+            "profit": profit,
+            "units_sold": units,
+            "unit_price": np.round(revenue / units, 2),
+            "profit_margin": margin,
+            "month_name": date.month_name(),
+            "day_of_week": date.day_name(),
+            "week_number": iso.week.to_numpy(),
+        }
+    )
+
+
+# ---------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------
+
+
+def measure(func, repeat=1):
+    """Best wall time (s) over ``repeat`` runs, peak traced memory and result."""
+    best, peak, result = float("inf"), 0, None
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        best = min(best, elapsed)
+    return best, peak, result
+
+
+def run_size(rows, workdir, repeat):
+    """Benchmark every pipeline stage on a synthetic extract of ``rows`` rows."""
+    path = os.path.join(workdir, f"sales_{rows}.csv")
+    generate_sales(rows).to_csv(path, index=False)
+    results = []
+
+    def record(stage, func, n, stage_repeat=repeat):
+        seconds, peak, result = measure(func, stage_repeat)
+        results.append(
+            {
+                "rows": rows,
+                "stage": stage,
+                "ms": round(seconds * 1000, 3),
+                "rows_per_s": round(n / seconds) if seconds else None,
+                "peak_mb": round(peak / 2**20, 2),
+            }
+        )
+        return result
+
+    # Loading runs once each: the first parquet load also writes the cache.
+    record("load_data (csv)", lambda: load_data(path, use_cache=False), rows, 1)
+    if os.path.exists(cache_path(path)):
+        os.remove(cache_path(path))
+    record("load_data (csv + write cache)", lambda: load_data(path), rows, 1)
+    df = record("load_data (parquet cache)", lambda: load_data(path), rows, 1)
+
+    cube = record("build_cube", lambda: build_cube(df), rows)
+    index = record("build_bitmap_index", lambda: build_bitmap_index(cube), len(cube))
+
+    for name, state in FILTER_STATES.items():
+        record(f"filter {name} (isin)", lambda: filter_cube(cube, **state), len(cube))
+        record(
+            f"filter {name} (bitmap)",
+            lambda: filter_cube(cube, index=index, **state),
+            len(cube),
+        )
+
+    n = len(cube)
+    record("kpi_summary", lambda: kpis(cube), n)
+    record("trend_chart", lambda: rollup(cube, "year_month", ["revenue"]), n)
+    record("region_chart", lambda: rollup(cube, "region", ["revenue"]), n)
+    record("product_chart", lambda: rollup(cube, "product", ["revenue"]), n)
+    record(
+        "sales_rep_chart",
+        lambda: rollup(cube, "sales_rep", ["revenue"]).nlargest(10, "revenue"),
+        n,
+    )
+    record("yoy_chart", lambda: rollup(cube, "year", ["revenue", "profit"]), n)
+    record("summary_table", lambda: monthly_summary(cube), n)
+
+    os.remove(path)
+    if os.path.exists(cache_path(path)):
+        os.remove(cache_path(path))
+    return results
+
+
+def print_table(results):
+    header = f"{'rows':>10}  {'stage':<32} {'ms':>11} {'rows/s':>14} {'peak MB':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        rate = f"{r['rows_per_s']:,}" if r["rows_per_s"] is not None else "-"
+        print(
+            f"{r['rows']:>10,}  {r['stage']:<32} {r['ms']:>11,.3f} "
+            f"{rate:>14} {r['peak_mb']:>9,.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[3])
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=DEFAULT_ROWS, help="Extract sizes"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Runs per in-memory stage (best kept)"
+    )
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.rows:
+            print(f"[INFO] Benchmarking {rows:,} rows...")
+            results.extend(run_size(rows, workdir, args.repeat))
+
+    print()
+    print_table(results)
+
+    if args.json:
+        report = {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "max_rss_mb": round(
+                resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2
+            ),
+            "results": results,
+        }
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n[OK] Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+dipTech Proprietary and Confidential
+Pre-aggregated sales cube for the Sales KPI Dashboard.
+
+The raw sales extract is rolled up once to one row per
+(year, month, region, product, sales_rep); every dashboard view is then
+answered from this cube instead of rescanning the raw rows.
+"""
+
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Dimensions the cube is keyed by. ``year_month`` is derived from year/month,
+# so carrying it along does not add any groups.
+CUBE_KEYS = ["year", "month", "year_month", "region", "product", "sales_rep"]
+
+# Additive measures: a roll-up of the cube is a plain sum.
+SUM_MEASURES = ["revenue", "profit", "units_sold"]
+
+# ``profit_margin`` is stored as a sum together with the number of rows that
+# contributed to it, so averages can be recomputed exactly at any level.
+MARGIN_COUNT = "margin_count"
+
+# Dimensions the dashboard filters on; each gets a bitmap index.
+FILTER_DIMENSIONS = ["year", "region", "product"]
+
+
+def build_cube(df):
+    """Aggregate raw sales rows into the dashboard cube."""
+    return (
+        df.groupby(CUBE_KEYS, observed=True, sort=True)
+        .agg(
+            revenue=("revenue", "sum"),
+            profit=("profit", "sum"),
+            units_sold=("units_sold", "sum"),
+            profit_margin=("profit_margin", "sum"),
+            margin_count=("profit_margin", "count"),
+        )
+        .reset_index()
+    )
+
+
+def merge_cubes(cube, delta):
+    """Fold the cube of newly arrived rows into an existing cube.
+
+    Only cube rows are re-aggregated, never the raw history, so the cost is
+    bounded by the size of the cube rather than the number of sales.
+    """
+    cube, delta = cube.copy(), delta.copy()
+    for col in CUBE_KEYS:
+        if isinstance(cube[col].dtype, pd.CategoricalDtype):
+            merged = union_categoricals(
+                [cube[col].array, pd.Categorical(delta[col])], sort_categories=True
+            ).categories
+            cube[col] = cube[col].cat.set_categories(merged)
+            delta[col] = delta[col].astype(cube[col].dtype)
+    measures = [col for col in cube.columns if col not in CUBE_KEYS]
+    return (
+        pd.concat([cube, delta], ignore_index=True)
+        .groupby(CUBE_KEYS, observed=True, sort=True)[measures]
+        .sum()
+        .reset_index()
+    )
+
+
+def build_bitmap_index(cube):
+    """Packed bitmap per distinct value of every filter dimension.
+
+    Returns ``{dimension: (positions, bitmaps)}`` where ``positions`` maps a
+    value to its row in ``bitmaps``, a ``(n_values, ceil(len(cube) / 8))``
+    uint8 array whose bits mark the cube rows holding that value.
+    """
+    rows = np.arange(len(cube))
+    index = {}
+    for dim in FILTER_DIMENSIONS:
+        codes, uniques = pd.factorize(cube[dim])
+        flags = np.zeros((len(uniques), len(cube)), dtype=bool)
+        flags[codes, rows] = True
+        positions = {value: i for i, value in enumerate(uniques.tolist())}
+        index[dim] = (positions, np.packbits(flags, axis=1))
+    return index
+
+
+def _select_bits(index, dim, values):
+    """OR together the bitmaps of the selected values of one dimension."""
+    positions, bitmaps = index[dim]
+    rows = [positions[v] for v in values if v in positions]
+    if not rows:
+        return np.zeros(bitmaps.shape[1], dtype=np.uint8)
+    return np.bitwise_or.reduce(bitmaps[rows], axis=0)
+
+
+def filter_cube(cube, years=None, regions=None, products=None, index=None):
+    """Restrict the cube to the selected years, regions and products.
+
+    With a bitmap ``index`` from :func:`build_bitmap_index` the selection is
+    resolved with a few bitwise operations instead of one ``isin`` scan per
+    dimension.
+    """
+    selection = {"year": years, "region": regions, "product": products}
+    if index is None:
+        mask = pd.Series(True, index=cube.index)
+        for dim, values in selection.items():
+            if values:
+                mask &= cube[dim].isin(values)
+        return cube[mask]
+
+    bits = None
+    for dim, values in selection.items():
+        if values:
+            selected = _select_bits(index, dim, values)
+            bits = selected if bits is None else bits & selected
+    if bits is None:
+        return cube
+    mask = np.unpackbits(bits, count=len(cube)).view(bool)
+    return cube[mask]
+
+
+def kpis(cube):
+    """Headline totals for a (filtered) cube."""
+    count = cube[MARGIN_COUNT].sum()
+    return {
+        "revenue": cube.revenue.sum(),
+        "profit": cube.profit.sum(),
+        "units_sold": int(cube.units_sold.sum()),
+        "profit_margin": cube.profit_margin.sum() / count if count else float("nan"),
+    }
+
+
+def rollup(cube, by, measures):
+    """Sum ``measures`` over the ``by`` dimension(s)."""
+    return cube.groupby(by, observed=True)[measures].sum().reset_index()
+
+
+def monthly_summary(cube):
+    """Year/month/region/product table with summed measures and mean margin."""
+    table = rollup(
+        cube,
+        ["year", "month", "region", "product"],
+        SUM_MEASURES + ["profit_margin", MARGIN_COUNT],
+    )
+    table["profit_margin"] = table["profit_margin"] / table[MARGIN_COUNT]
+    # Groups come out of the roll-up ordered by (year, month, region, product),
+    # a stable sort keeps region/product ascending within each month.
+    return (
+        table.drop(columns=MARGIN_COUNT)
+        .sort_values(["year", "month"], ascending=False, kind="stable")
+        .reset_index(drop=True)
+    )
+
+
+# ---------------------------------------------------------------------
+# Shared, versioned cube
+# ---------------------------------------------------------------------
+
+CubeSnapshot = namedtuple("CubeSnapshot", ["version", "cube", "index"])
+
+
+class CubeStore:
+    """Current cube and bitmap index, swapped atomically on every update.
+
+    Readers take ``store.snapshot`` once and work on that immutable view;
+    ``version`` is bumped whenever new rows are folded in.
+    """
+
+    def __init__(self, cube):
+        self._lock = threading.Lock()
+        self.snapshot = CubeSnapshot(0, cube, build_bitmap_index(cube))
+
+    def append(self, rows):
+        """Fold raw sales ``rows`` into the cube and publish a new snapshot."""
+        if rows.empty:
+            return self.snapshot
+        delta = build_cube(rows)
+        with self._lock:
+            current = self.snapshot
+            cube = merge_cubes(current.cube, delta)
+            self.snapshot = CubeSnapshot(
+                current.version + 1, cube, build_bitmap_index(cube)
+            )
+        return self.snapshot
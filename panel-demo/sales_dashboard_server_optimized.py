@@ -5,15 +5,37 @@ Optimized Sales KPI Dashboard (Panel + Bokeh)
 Run with: panel serve sales_dashboard.py --show --autoreload
 """
 
+import os
+
+import numpy as np
 import pandas as pd
 import panel as pn
 
 from bokeh.plotting import figure
-from bokeh.models import ColumnDataSource, HoverTool, Legend, NumeralTickFormatter
+from bokeh.models import (
+    BasicTickFormatter,
+    ColumnDataSource,
+    HoverTool,
+    Legend,
+    NumeralTickFormatter,
+)
 from bokeh.transform import dodge
 from bokeh.palettes import Category20
 from math import pi
 
+from sales_cube import (
+    CubeStore,
+    build_cube,
+    filter_cube,
+    kpis,
+    monthly_summary,
+    rollup,
+)
+from sales_loader import SOURCE_CSV, load_data
+from sales_metrics import RECORDER
+from sales_shared import shared_cube
+from sales_stream import LiveFeed, SalesTail
+
 pn.extension("tabulator")
 
 # ---------------------------------------------------------------------
@@ -21,16 +43,51 @@ pn.extension("tabulator")
 # ---------------------------------------------------------------------
 
 
-def load_data():
-    df = pd.read_csv("sales_data.csv")
-    df["date"] = pd.to_datetime(df["date"])
-    df["year"] = df["date"].dt.year
-    df["month"] = df["date"].dt.month
-    df["year_month"] = df["date"].dt.to_period("M").astype(str)
-    return df
+# Live mode: follow rows appended to the CSV and/or CSV files dropped into a
+# directory, checking for new data every SALES_POLL_SECONDS.
+TAIL_CSV = os.getenv("SALES_TAIL_CSV", "False") == "True"
+DROP_DIR = os.getenv("SALES_DROP_DIR")
+POLL_SECONDS = int(os.getenv("SALES_POLL_SECONDS", "30"))
+LIVE = TAIL_CSV or bool(DROP_DIR)
+
+# Multi-process mode (panel serve --num-procs N): the first worker builds the
+# cube into POSIX shared memory and the other workers map it zero-copy.
+SHARED_MEMORY = os.getenv("SALES_SHARED_MEMORY", "False") == "True"
+
+# Admin mode adds a Performance tab and measures the size of every document
+# change sent to the browser. Stage latencies are always recorded.
+ADMIN = os.getenv("SALES_ADMIN", "False") == "True"
+
+
+def load_cube():
+    """Load the raw extract and roll it up to the dashboard cube."""
+    return build_cube(load_data())
+
+
+def load_store():
+    """Build (or attach to) the cube and wrap it in the shared, versioned store."""
+    offset = os.path.getsize(SOURCE_CSV)
+    if SHARED_MEMORY:
+        cube, shm = shared_cube(SOURCE_CSV, load_cube)
+        # The mapping must stay open for as long as the process serves the cube.
+        pn.state.cache["sales_shared_memory"] = shm
+    else:
+        cube = load_cube()
+    store = CubeStore(cube)
+    if LIVE:
+        tail = SalesTail(SOURCE_CSV if TAIL_CSV else None, offset, DROP_DIR)
+        pn.state.schedule_task(
+            "sales_live_feed",
+            LiveFeed(store, tail),
+            period=f"{POLL_SECONDS}s",
+            threaded=bool(pn.config.nthreads),
+        )
+    return store
 
 
-df = load_data()
+# Built once per server process and shared by every session.
+store = pn.state.as_cached("sales_store", load_store)
+cube = store.snapshot.cube
 
 # ---------------------------------------------------------------------
 # Widgets
@@ -38,20 +95,20 @@ df = load_data()
 
 year_select = pn.widgets.MultiChoice(
     name="Years",
-    value=sorted(df.year.unique().tolist()),
-    options=sorted(df.year.unique().tolist()),
+    value=sorted(cube.year.unique().tolist()),
+    options=sorted(cube.year.unique().tolist()),
 )
 
 region_select = pn.widgets.MultiChoice(
     name="Regions",
-    value=sorted(df.region.unique().tolist()),
-    options=sorted(df.region.unique().tolist()),
+    value=sorted(cube.region.unique().tolist()),
+    options=sorted(cube.region.unique().tolist()),
 )
 
 product_select = pn.widgets.MultiChoice(
     name="Products",
-    value=sorted(df["product"].unique().tolist()),
-    options=sorted(df["product"].unique().tolist()),
+    value=sorted(cube["product"].unique().tolist()),
+    options=sorted(cube["product"].unique().tolist()),
 )
 
 metric_select = pn.widgets.Select(
@@ -65,233 +122,446 @@ metric_select = pn.widgets.Select(
 # ---------------------------------------------------------------------
 
 
-def filtered_df():
-    """Helper to apply current widget filters."""
-    dff = df
-    if year_select.value:
-        dff = dff[dff.year.isin(year_select.value)]
-    if region_select.value:
-        dff = dff[dff.region.isin(region_select.value)]
-    if product_select.value:
-        dff = dff[dff["product"].isin(product_select.value)]
-    return dff
+# Number of distinct filter states kept in the shared filter cache.
+FILTER_CACHE_SIZE = 64
 
 
-# ---------------------------------------------------------------------
-# KPI summary
-# ---------------------------------------------------------------------
+# The cached functions are keyed by the snapshot version (an int), not the
+# snapshot: pn.cache hashes tuples element by element, so passing the
+# snapshot would hash the whole cube and bitmap index on every lookup.
+# They read the current snapshot from the store; if it moved on since
+# ``version`` was taken, the result is only fresher and the old key is not
+# asked for again.
 
 
-@pn.depends(
-    year_select.param.value,
-    region_select.param.value,
-    product_select.param.value,
-)
-def kpi_summary(_years, _regions, _products):
-    dff = filtered_df()
-    if dff.empty:
-        return pn.pane.Markdown("### No data for selection")
-
-    html = f"""
-    <div style="display:flex;gap:24px;justify-content:space-between;
-                background:#1565c0;color:white;padding:20px;border-radius:14px;">
-        <div><h2>${dff.revenue.sum():,.0f}</h2><p>Total Revenue</p></div>
-        <div><h2>${dff.profit.sum():,.0f}</h2><p>Total Profit</p></div>
-        <div><h2>{dff.units_sold.sum():,}</h2><p>Units Sold</p></div>
-        <div><h2>{dff.profit_margin.mean():.1f}%</h2><p>Avg Margin</p></div>
-    </div>
+@pn.cache(max_items=FILTER_CACHE_SIZE, policy="LRU")
+@RECORDER.timed("filter.miss")
+def cached_filter(version, years, regions, products):
+    """Filter the cube once per filter state, shared by all callbacks and sessions.
+
+    The returned frame is shared, callers must treat it as read-only.
     """
-    return pn.pane.HTML(html)
+    snapshot = store.snapshot
+    return filter_cube(
+        snapshot.cube,
+        years=years,
+        regions=regions,
+        products=products,
+        index=snapshot.index,
+    )
+
+
+def filter_state():
+    """Cache key for the current data snapshot and widget filters."""
+    return (
+        store.snapshot.version,
+        tuple(sorted(year_select.value)),
+        tuple(sorted(region_select.value)),
+        tuple(sorted(product_select.value)),
+    )
+
+
+@RECORDER.timed("filter")
+def filtered_cube():
+    """Helper to apply current widget filters to the pre-aggregated cube."""
+    return cached_filter(*filter_state())
 
 
 # ---------------------------------------------------------------------
-# Trend chart
+# KPI summary
 # ---------------------------------------------------------------------
 
+kpi_pane = pn.pane.HTML(sizing_mode="stretch_width")
+
 
 @pn.depends(
     year_select.param.value,
     region_select.param.value,
     product_select.param.value,
-    metric_select.param.value,
+    watch=True,
 )
-def trend_chart(_years, _regions, _products, metric):
-    dff = filtered_df()
+@RECORDER.timed("kpi_summary")
+def kpi_summary(_years, _regions, _products):
+    dff = filtered_cube()
     if dff.empty:
-        return pn.pane.Markdown("No data")
+        kpi_pane.object = "<h3>No data for selection</h3>"
+        return
+
+    with RECORDER.measure("kpi_summary.aggregate"):
+        totals = kpis(dff)
+    with RECORDER.measure("kpi_summary.render"):
+        kpi_pane.object = f"""
+        <div style="display:flex;gap:24px;justify-content:space-between;
+                    background:#1565c0;color:white;padding:20px;border-radius:14px;">
+            <div><h2>${totals["revenue"]:,.0f}</h2><p>Total Revenue</p></div>
+            <div><h2>${totals["profit"]:,.0f}</h2><p>Total Profit</p></div>
+            <div><h2>{totals["units_sold"]:,}</h2><p>Units Sold</p></div>
+            <div><h2>{totals["profit_margin"]:.1f}%</h2><p>Avg Margin</p></div>
+        </div>
+        """
 
-    data = dff.groupby("year_month")[metric].sum().reset_index()
 
-    src = ColumnDataSource(data)
+# ---------------------------------------------------------------------
+# Chart helpers
+#
+# Figures are built once per session; callbacks only push new column data
+# and axis factors into the existing models, so Panel sends small property
+# patches to the browser instead of a whole new Bokeh document.
+# ---------------------------------------------------------------------
 
-    p = figure(
-        title=f"{metric.title()} Trend",
-        x_range=data.year_month.tolist(),
-        height=350,
-        sizing_mode="stretch_width",
-    )
+CURRENCY_FORMAT = NumeralTickFormatter(format="$0,0")
+PLAIN_FORMAT = BasicTickFormatter()
 
-    p.line("year_month", metric, source=src, line_width=3)
-    p.scatter("year_month", metric, source=src, size=6)
 
-    p.add_tools(
-        HoverTool(tooltips=[("Month", "@year_month"), (metric, f"@{metric}{{0,0}}")])
-    )
+def update_source(p, src, data, x):
+    """Bring ``src`` and the categorical factors of ``p`` up to date with ``data``.
 
+    When the existing factors are an unchanged prefix of the new ones (e.g.
+    live data landing in the latest months) only the changed values are
+    patched and new factors are streamed; otherwise the data is replaced.
+    """
+    old = list(p.x_range.factors)
+    factors = data[x].astype(str).tolist()
+    columns = {col: data[col].to_numpy() for col in src.column_names}
+
+    if not old or factors[: len(old)] != old:
+        src.data = columns
+        p.x_range.factors = factors
+        return
+
+    patches = {}
+    for col in src.column_names:
+        if col == x:
+            continue
+        values = columns[col]
+        changed = np.flatnonzero(np.asarray(src.data[col]) != values[: len(old)])
+        if len(changed) > len(old) // 2:
+            src.data = columns
+            p.x_range.factors = factors
+            return
+        if len(changed):
+            patches[col] = [(int(i), values[i].item()) for i in changed]
+
+    if patches:
+        src.patch(patches)
+    if len(factors) > len(old):
+        src.stream({col: values[len(old) :] for col, values in columns.items()})
+        p.x_range.factors = factors
+
+
+def bar_chart(x, y, title, color):
+    src = ColumnDataSource(data={x: [], y: []})
+    p = figure(x_range=[], height=300, title=title, sizing_mode="stretch_width")
+    p.vbar(x=x, top=y, source=src, width=0.7, color=color)
+    p.add_tools(HoverTool(tooltips=[(x, f"@{x}"), (y, f"@{y}{{0,0}}")]))
     p.xaxis.major_label_orientation = pi / 4
-
-    if metric in ["revenue", "profit"]:
-        p.yaxis.formatter = NumeralTickFormatter(format="$0,0")
-
-    return p
+    p.yaxis.formatter = CURRENCY_FORMAT
+    return p, src
 
 
 # ---------------------------------------------------------------------
-# Bar chart helpers
+# Trend chart
 # ---------------------------------------------------------------------
 
+# The selected metric is always stored in the ``value`` column so switching
+# metrics only changes data, title, tooltip and axis format.
+trend_source = ColumnDataSource(data={"year_month": [], "value": []})
+trend_hover = HoverTool(tooltips=[("Month", "@year_month"), ("value", "@value{0,0}")])
+trend_fig = figure(x_range=[], height=350, sizing_mode="stretch_width")
+trend_fig.line("year_month", "value", source=trend_source, line_width=3)
+trend_fig.scatter("year_month", "value", source=trend_source, size=6)
+trend_fig.add_tools(trend_hover)
+trend_fig.xaxis.major_label_orientation = pi / 4
 
-def bar_chart(data, x, y, title, color):
-    src = ColumnDataSource(data)
-    p = figure(
-        x_range=data[x].tolist(), height=300, title=title, sizing_mode="stretch_width"
-    )
-    p.vbar(x=x, top=y, source=src, width=0.7, color=color)
-    p.add_tools(HoverTool(tooltips=[(x, f"@{x}"), (y, f"@{y}{{0,0}}")]))
-    p.xaxis.major_label_orientation = pi / 4
-    p.yaxis.formatter = NumeralTickFormatter(format="$0,0")
-    return p
+
+@pn.depends(
+    year_select.param.value,
+    region_select.param.value,
+    product_select.param.value,
+    metric_select.param.value,
+    watch=True,
+)
+@RECORDER.timed("trend_chart")
+def trend_chart(_years, _regions, _products, metric):
+    dff = filtered_cube()
+    with RECORDER.measure("trend_chart.aggregate"):
+        data = rollup(dff, "year_month", [metric])
+        data = data.rename(columns={metric: "value"})
+
+    with RECORDER.measure("trend_chart.render"):
+        trend_fig.title.text = f"{metric.title()} Trend"
+        trend_hover.tooltips = [("Month", "@year_month"), (metric, "@value{0,0}")]
+        trend_fig.yaxis.formatter = (
+            CURRENCY_FORMAT if metric in ["revenue", "profit"] else PLAIN_FORMAT
+        )
+        update_source(trend_fig, trend_source, data, "year_month")
 
 
 # ---------------------------------------------------------------------
 # Regional / product / sales rep
 # ---------------------------------------------------------------------
 
+region_fig, region_source = bar_chart(
+    "region", "revenue", "Revenue by Region", "#28a745"
+)
+product_fig, product_source = bar_chart(
+    "product", "revenue", "Revenue by Product", "#dc3545"
+)
+sales_rep_fig, sales_rep_source = bar_chart(
+    "sales_rep", "revenue", "Top 10 Sales Reps", "#ffc107"
+)
+
 
 @pn.depends(
     year_select.param.value,
     region_select.param.value,
     product_select.param.value,
+    watch=True,
 )
+@RECORDER.timed("region_chart")
 def region_chart(_years, _regions, _products):
-    dff = filtered_df()
-    if dff.empty:
-        return pn.pane.Markdown("No data")
-    data = dff.groupby("region").revenue.sum().reset_index()
-    return bar_chart(data, "region", "revenue", "Revenue by Region", "#28a745")
+    dff = filtered_cube()
+    with RECORDER.measure("region_chart.aggregate"):
+        data = rollup(dff, "region", ["revenue"])
+    with RECORDER.measure("region_chart.render"):
+        update_source(region_fig, region_source, data, "region")
 
 
 @pn.depends(
     year_select.param.value,
     region_select.param.value,
     product_select.param.value,
+    watch=True,
 )
+@RECORDER.timed("product_chart")
 def product_chart(_years, _regions, _products):
-    dff = filtered_df()
-    if dff.empty:
-        return pn.pane.Markdown("No data")
-    data = dff.groupby("product").revenue.sum().reset_index()
-    return bar_chart(data, "product", "revenue", "Revenue by Product", "#dc3545")
+    dff = filtered_cube()
+    with RECORDER.measure("product_chart.aggregate"):
+        data = rollup(dff, "product", ["revenue"])
+    with RECORDER.measure("product_chart.render"):
+        update_source(product_fig, product_source, data, "product")
 
 
 @pn.depends(
     year_select.param.value,
     region_select.param.value,
     product_select.param.value,
+    watch=True,
 )
+@RECORDER.timed("sales_rep_chart")
 def sales_rep_chart(_years, _regions, _products):
-    dff = filtered_df()
-    if dff.empty:
-        return pn.pane.Markdown("No data")
-    data = dff.groupby("sales_rep").revenue.sum().nlargest(10).reset_index()
-    return bar_chart(data, "sales_rep", "revenue", "Top 10 Sales Reps", "#ffc107")
+    dff = filtered_cube()
+    with RECORDER.measure("sales_rep_chart.aggregate"):
+        data = rollup(dff, "sales_rep", ["revenue"]).nlargest(10, "revenue")
+    with RECORDER.measure("sales_rep_chart.render"):
+        update_source(sales_rep_fig, sales_rep_source, data, "sales_rep")
 
 
 # ---------------------------------------------------------------------
 # YoY chart
 # ---------------------------------------------------------------------
 
+yoy_source = ColumnDataSource(data={"year_str": [], "revenue": [], "profit": []})
+yoy_fig = figure(x_range=[], height=350, title="Year-over-Year Performance")
+
+r1 = yoy_fig.vbar(
+    x=dodge("year_str", -0.2, range=yoy_fig.x_range),
+    top="revenue",
+    source=yoy_source,
+    width=0.35,
+    color="#2596be",
+)
+r2 = yoy_fig.vbar(
+    x=dodge("year_str", 0.2, range=yoy_fig.x_range),
+    top="profit",
+    source=yoy_source,
+    width=0.35,
+    color="#28a745",
+)
+
+yoy_fig.add_layout(Legend(items=[("Revenue", [r1]), ("Profit", [r2])]), "right")
+yoy_fig.yaxis.formatter = CURRENCY_FORMAT
+
 
 @pn.depends(
     year_select.param.value,
     region_select.param.value,
     product_select.param.value,
+    watch=True,
 )
+@RECORDER.timed("yoy_chart")
 def yoy_chart(_years, _regions, _products):
-    dff = filtered_df()
-    if dff.empty:
-        return pn.pane.Markdown("No data")
-
-    data = dff.groupby("year")[["revenue", "profit"]].sum().reset_index()
-    data["year_str"] = data["year"].astype(str)
-    src = ColumnDataSource(data)
-
-    p = figure(
-        x_range=data["year_str"].tolist(),
-        height=350,
-        title="Year-over-Year Performance",
-    )
-
-    r1 = p.vbar(
-        x=dodge("year_str", -0.2, range=p.x_range),
-        top="revenue",
-        source=src,
-        width=0.35,
-        color="#2596be",
-    )
-    r2 = p.vbar(
-        x=dodge("year_str", 0.2, range=p.x_range),
-        top="profit",
-        source=src,
-        width=0.35,
-        color="#28a745",
-    )
-
-    p.add_layout(Legend(items=[("Revenue", [r1]), ("Profit", [r2])]), "right")
-
-    p.yaxis.formatter = NumeralTickFormatter(format="$0,0")
-    return p
+    dff = filtered_cube()
+    with RECORDER.measure("yoy_chart.aggregate"):
+        data = rollup(dff, "year", ["revenue", "profit"])
+        data["year_str"] = data["year"].astype(str)
+    with RECORDER.measure("yoy_chart.render"):
+        update_source(yoy_fig, yoy_source, data, "year_str")
 
 
 # ---------------------------------------------------------------------
 # Table
 # ---------------------------------------------------------------------
 
+# The table holds every group of the selection. With remote pagination the
+# rows stay on the server: Tabulator requests one page at a time and header
+# sorts and filters are applied server-side before the page is sliced.
+summary_tabulator = pn.widgets.Tabulator(
+    pagination="remote",
+    page_size=10,
+    header_filters=True,
+    show_index=False,
+    disabled=True,
+    sizing_mode="stretch_width",
+)
+
+
+@pn.cache(max_items=FILTER_CACHE_SIZE, policy="LRU")
+def cached_summary(version, years, regions, products):
+    """Monthly summary for one filter state, shared across sessions (read-only)."""
+    return monthly_summary(cached_filter(version, years, regions, products))
+
 
 @pn.depends(
     year_select.param.value,
     region_select.param.value,
     product_select.param.value,
+    watch=True,
 )
+@RECORDER.timed("summary_table")
 def summary_table(_years, _regions, _products):
-    dff = filtered_df()
-    if dff.empty:
-        return pn.pane.Markdown("No data")
-
-    table = (
-        dff.groupby(["year", "month", "region", "product"])
-        .agg(
-            {
-                "revenue": "sum",
-                "profit": "sum",
-                "units_sold": "sum",
-                "profit_margin": "mean",
-            }
-        )
-        .reset_index()
-        .sort_values(["year", "month"], ascending=False)
-        .head(50)
-    )
+    with RECORDER.measure("summary_table.aggregate"):
+        table = cached_summary(*filter_state())
+    with RECORDER.measure("summary_table.render"):
+        summary_tabulator.value = table
 
-    return pn.widgets.Tabulator(
-        table, pagination="remote", page_size=10, sizing_mode="stretch_width"
+
+# ---------------------------------------------------------------------
+# Initial render
+# ---------------------------------------------------------------------
+
+
+def render_all():
+    """Run every view callback for the current widget state."""
+    filters = (year_select.value, region_select.value, product_select.value)
+    for callback in (
+        kpi_summary,
+        region_chart,
+        product_chart,
+        sales_rep_chart,
+        yoy_chart,
+        summary_table,
+    ):
+        callback(*filters)
+    trend_chart(*filters, metric_select.value)
+
+
+render_all()
+
+# ---------------------------------------------------------------------
+# Live updates
+# ---------------------------------------------------------------------
+
+rendered_version = store.snapshot.version
+
+
+def extend_options(widget, values):
+    """Add newly seen values to a filter, selecting them if all were selected.
+
+    Returns True when the selection changed, which re-renders via the watchers.
+    """
+    options = sorted(set(widget.options) | set(values))
+    if options == widget.options:
+        return False
+    all_selected = set(widget.value) == set(widget.options)
+    widget.options = options
+    if all_selected:
+        widget.value = options
+    return all_selected
+
+
+def refresh_live():
+    """Re-render this session when the shared cube has received new rows."""
+    global rendered_version
+    snapshot = store.snapshot
+    if snapshot.version == rendered_version:
+        return
+    rendered_version = snapshot.version
+
+    with pn.io.hold():
+        selection_changed = False
+        for widget, column in (
+            (year_select, "year"),
+            (region_select, "region"),
+            (product_select, "product"),
+        ):
+            values = snapshot.cube[column].unique().tolist()
+            selection_changed |= extend_options(widget, values)
+        if not selection_changed:
+            render_all()
+
+
+if LIVE:
+    pn.state.add_periodic_callback(refresh_live, period=POLL_SECONDS * 1000)
+
+# ---------------------------------------------------------------------
+# Performance (admin)
+# ---------------------------------------------------------------------
+
+performance_table = pn.widgets.Tabulator(
+    show_index=False, disabled=True, sizing_mode="stretch_width"
+)
+performance_refresh = pn.widgets.Button(name="Refresh", button_type="primary")
+
+
+def refresh_performance(_event=None):
+    """Show the latency and payload histograms of this server process."""
+    performance_table.value = pd.DataFrame(
+        RECORDER.rows(), columns=["stage", "kind", "count", "mean", "max"]
     )
 
 
+performance_refresh.on_click(refresh_performance)
+
+if ADMIN:
+    if pn.state.curdoc is not None:
+        RECORDER.watch_document(pn.state.curdoc)
+    refresh_performance()
+
 # ---------------------------------------------------------------------
 # Template
 # ---------------------------------------------------------------------
 
+dashboard = pn.Column(
+    kpi_pane,
+    pn.Row(trend_fig, yoy_fig),
+    pn.Row(region_fig, product_fig),
+    sales_rep_fig,
+    pn.pane.Markdown("### Monthly Performance"),
+    summary_tabulator,
+    sizing_mode="stretch_width",
+)
+
+if ADMIN:
+    main = pn.Tabs(
+        ("Dashboard", dashboard),
+        (
+            "Performance",
+            pn.Column(
+                pn.pane.Markdown(
+                    "Latency (ms) and payload (bytes) per stage for this server "
+                    "process. Full histograms: `/dashboard-metrics` when served "
+                    "with `--plugins sales_metrics`."
+                ),
+                performance_refresh,
+                performance_table,
+            ),
+        ),
+        dynamic=True,
+    )
+else:
+    main = dashboard
+
 template = pn.template.FastListTemplate(
     title="Sales KPI Dashboard",
     sidebar=[
@@ -302,14 +572,7 @@ template = pn.template.FastListTemplate(
         pn.pane.Markdown("## Metric"),
         metric_select,
     ],
-    main=[
-        kpi_summary,
-        pn.Row(trend_chart, yoy_chart),
-        pn.Row(region_chart, product_chart),
-        sales_rep_chart,
-        pn.pane.Markdown("### Monthly Performance"),
-        summary_table,
-    ],
+    main=[main],
     header_background="#1565c0",
 )
 
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+dipTech Proprietary and Confidential
+Sales extract loader for the Sales KPI Dashboard.
+
+The CSV is parsed once and written to a columnar Parquet cache next to it,
+with the low-cardinality string columns stored as categoricals. Later loads
+read the cache directly as long as the source CSV is unchanged.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet cache is optional, fall back to plain CSV
+    pa = pq = None
+
+SOURCE_CSV = "sales_data.csv"
+
+CATEGORICAL_COLUMNS = [
+    "region",
+    "product",
+    "sales_rep",
+    "customer",
+    "quarter",
+    "month_name",
+    "day_of_week",
+    "year_month",
+]
+
+# Parquet schema metadata key holding the fingerprint of the source CSV.
+FINGERPRINT_KEY = b"sales_dashboard.source"
+
+
+def cache_path(path):
+    """Location of the columnar cache for ``path``."""
+    return os.path.splitext(path)[0] + ".parquet"
+
+
+def source_fingerprint(path):
+    """Size and modification time identifying one version of the CSV."""
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def parse_csv(path, names=None):
+    """Parse the raw CSV and derive the columns used by the dashboard.
+
+    ``path`` may also be a file-like object; pass ``names`` when it holds
+    headerless rows, e.g. a chunk appended to an existing extract.
+    """
+    df = pd.read_csv(
+        path,
+        names=names,
+        header=0 if names is None else None,
+        parse_dates=["date"],
+        dtype={col: "category" for col in CATEGORICAL_COLUMNS if col != "year_month"},
+    )
+    df["year"] = df["date"].dt.year.astype("int16")
+    df["month"] = df["date"].dt.month.astype("int8")
+
+    # Derive year_month from integer period codes instead of formatting one
+    # string per row; only the distinct months are turned into labels.
+    periods = df["year"].astype("int32") * 12 + df["month"] - 1
+    uniques = np.unique(periods.to_numpy())
+    labels = [f"{p // 12}-{p % 12 + 1:02d}" for p in uniques]
+    df["year_month"] = pd.Categorical.from_codes(
+        np.searchsorted(uniques, periods.to_numpy()), categories=labels
+    )
+    return df
+
+
+def read_cache(path, fingerprint):
+    """Return the cached frame, or None when missing or stale."""
+    if not os.path.exists(path):
+        return None
+    try:
+        metadata = pq.read_schema(path).metadata or {}
+        if json.loads(metadata.get(FINGERPRINT_KEY, b"null")) != fingerprint:
+            return None
+        return pd.read_parquet(path)
+    except (OSError, ValueError, pa.ArrowException):
+        return None
+
+
+def write_cache(df, path, fingerprint):
+    """Atomically write ``df`` to the columnar cache."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[FINGERPRINT_KEY] = json.dumps(fingerprint).encode()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pq.write_table(table.replace_schema_metadata(metadata), tmp_path)
+    os.replace(tmp_path, path)
+
+
+def load_data(path=SOURCE_CSV, use_cache=True):
+    """Load the sales extract, going through the Parquet cache when possible."""
+    if not use_cache or pq is None:
+        return parse_csv(path)
+
+    fingerprint = source_fingerprint(path)
+    cached = cache_path(path)
+    df = read_cache(cached, fingerprint)
+    if df is None:
+        df = parse_csv(path)
+        try:
+            write_cache(df, cached, fingerprint)
+        except OSError as e:
+            print(f"[WARNING] Could not write columnar cache {cached}: {e}")
+    return df
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+dipTech Proprietary and Confidential
+Latency and payload instrumentation for the Sales KPI Dashboard.
+
+A process-wide :data:`RECORDER` keeps fixed-bucket histograms of the time
+spent in each dashboard stage (filtering, aggregation, model updates) and of
+the size of the Bokeh document changes each stage sends to the browser.
+
+The histograms are served as JSON when the module is loaded as a Panel
+plugin::
+
+    panel serve sales_dashboard_server_optimized.py --plugins sales_metrics
+
+after which ``GET /dashboard-metrics`` returns :meth:`Recorder.snapshot`.
+"""
+
+import contextvars
+import functools
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from bokeh.core.serialization import Serializer
+from tornado.web import RequestHandler
+
+# Upper bounds of the histogram buckets; values above the last bound fall
+# into a final overflow bucket.
+LATENCY_BUCKETS_MS = [0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+PAYLOAD_BUCKETS_BYTES = [256, 1024, 4096, 16384, 65536, 262144, 1048576]
+
+# Stage that is currently running in this thread/task, used to attribute
+# document changes to the callback that caused them.
+current_stage = contextvars.ContextVar("current_stage", default=None)
+
+
+class Histogram:
+    """Fixed-bucket histogram with count, sum and max."""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def to_dict(self):
+        labels = [str(bound) for bound in self.bounds] + ["+Inf"]
+        return {
+            "count": self.count,
+            "sum": round(self.total, 3),
+            "mean": round(self.total / self.count, 3) if self.count else 0.0,
+            "max": round(self.max, 3),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class Recorder:
+    """Thread-safe collection of per-stage latency and payload histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = {}
+        self.payload = {}
+
+    def _observe(self, histograms, bounds, stage, value):
+        with self._lock:
+            histogram = histograms.get(stage)
+            if histogram is None:
+                histogram = histograms[stage] = Histogram(bounds)
+            histogram.observe(value)
+
+    def observe_latency(self, stage, ms):
+        self._observe(self.latency, LATENCY_BUCKETS_MS, stage, ms)
+
+    def observe_payload(self, stage, size):
+        self._observe(self.payload, PAYLOAD_BUCKETS_BYTES, stage, size)
+
+    @contextmanager
+    def measure(self, stage):
+        """Record the wall time of the ``with`` block under ``stage``."""
+        token = current_stage.set(stage)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_latency(stage, (time.perf_counter() - start) * 1000)
+            current_stage.reset(token)
+
+    def timed(self, stage):
+        """Decorator recording every call of the function under ``stage``."""
+
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.measure(stage):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def watch_document(self, doc):
+        """Record the serialized size of every change sent for ``doc``.
+
+        Each change is serialized a second time to be measured, so this is
+        meant for diagnosis rather than always-on use.
+        """
+
+        def on_change(event):
+            serialized = Serializer().serialize(event)
+            size = len(json.dumps(serialized.content, default=str))
+            size += sum(memoryview(buffer.data).nbytes for buffer in serialized.buffers)
+            self.observe_payload(current_stage.get() or "other", size)
+
+        doc.on_change(on_change)
+
+    def snapshot(self):
+        """JSON-serializable view of all histograms."""
+        with self._lock:
+            return {
+                "latency_ms": {k: h.to_dict() for k, h in sorted(self.latency.items())},
+                "payload_bytes": {
+                    k: h.to_dict() for k, h in sorted(self.payload.items())
+                },
+            }
+
+    def rows(self):
+        """One row per stage and kind, for display in a table."""
+        rows = []
+        for kind, stats in self.snapshot().items():
+            for stage, histogram in stats.items():
+                rows.append(
+                    {
+                        "stage": stage,
+                        "kind": kind,
+                        "count": histogram["count"],
+                        "mean": histogram["mean"],
+                        "max": histogram["max"],
+                    }
+                )
+        return rows
+
+
+RECORDER = Recorder()
+
+
+class MetricsHandler(RequestHandler):
+    """Serve the histograms of this server process as JSON."""
+
+    def get(self):
+        self.set_header("Content-Type", "application/json")
+        self.write(json.dumps(RECORDER.snapshot()))
+
+
+# Picked up by ``panel serve --plugins sales_metrics``.
+ROUTES = [(r"/dashboard-metrics", MetricsHandler, {})]
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+dipTech Proprietary and Confidential
+Shared-memory cube for multi-process serving of the Sales KPI Dashboard.
+
+With ``panel serve --num-procs N`` every worker is a separate process. The
+first worker to start loads the extract, builds the cube and copies its
+columns into a named POSIX shared memory block; every other worker maps that
+block and wraps the column buffers in a DataFrame without copying them.
+
+Block layout: an 8-byte little-endian header length, a JSON header
+describing each column (dtype, offset, length and categories for
+categoricals), then the 8-byte aligned column buffers.
+"""
+
+import atexit
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+
+HEADER_SIZE = 8
+ALIGNMENT = 8
+
+
+def segment_name(path, prefix="sales_cube"):
+    """Shared memory name for the current version of the source file.
+
+    The name changes with the file's size and modification time, so a new
+    server never attaches to a cube built from an older extract.
+    """
+    stat = os.stat(path)
+    key = f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return f"{prefix}_{hashlib.sha1(key.encode()).hexdigest()[:16]}"
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def publish_cube(cube, name):
+    """Copy ``cube`` into a new shared memory block called ``name``."""
+    columns, arrays, offset = [], [], 0
+    for col in cube.columns:
+        series = cube[col]
+        spec = {"name": col}
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            spec["categories"] = series.cat.categories.tolist()
+            values = series.cat.codes.to_numpy()
+        else:
+            values = series.to_numpy()
+        values = np.ascontiguousarray(values)
+        offset = _aligned(offset)
+        spec.update(dtype=values.dtype.str, offset=offset, length=len(values))
+        columns.append(spec)
+        arrays.append(values)
+        offset += values.nbytes
+
+    header = json.dumps({"rows": len(cube), "columns": columns}).encode()
+    data_start = _aligned(HEADER_SIZE + len(header))
+    shm = shared_memory.SharedMemory(name=name, create=True, size=data_start + offset)
+    shm.buf[:HEADER_SIZE] = len(header).to_bytes(HEADER_SIZE, "little")
+    shm.buf[HEADER_SIZE : HEADER_SIZE + len(header)] = header
+    for spec, values in zip(columns, arrays):
+        start = data_start + spec["offset"]
+        target = np.ndarray(values.shape, values.dtype, buffer=shm.buf, offset=start)
+        target[:] = values
+    return shm
+
+
+def read_cube(shm):
+    """Wrap the column buffers of a published block in a DataFrame."""
+    header_len = int.from_bytes(shm.buf[:HEADER_SIZE], "little")
+    header = json.loads(bytes(shm.buf[HEADER_SIZE : HEADER_SIZE + header_len]))
+    data_start = _aligned(HEADER_SIZE + header_len)
+
+    data = {}
+    for spec in header["columns"]:
+        values = np.ndarray(
+            (spec["length"],),
+            np.dtype(spec["dtype"]),
+            buffer=shm.buf,
+            offset=data_start + spec["offset"],
+        )
+        values.flags.writeable = False
+        if "categories" in spec:
+            values = pd.Categorical.from_codes(values, categories=spec["categories"])
+        data[spec["name"]] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def attach_cube(name):
+    """Map the block ``name`` and return ``(cube, shm)`` without copying.
+
+    The caller must keep ``shm`` referenced for as long as the cube is used.
+    """
+    shm = shared_memory.SharedMemory(name=name)
+    # Only the publisher owns the block; stop this process's resource
+    # tracker from unlinking it when the worker exits.
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return read_cube(shm), shm
+
+
+def _release(shm):
+    shm.close()
+    shm.unlink()
+
+
+def shared_cube(path, build):
+    """Return the cube for ``path``, building and publishing it at most once.
+
+    Workers serialize on a lock file: the first one calls ``build()`` and
+    publishes the result (unlinking it again when that worker exits), the
+    others attach to the published block. Returns ``(cube, shm)``.
+    """
+    name = segment_name(path)
+    lock_path = os.path.join(tempfile.gettempdir(), f"{name}.lock")
+    with open(lock_path, "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            return attach_cube(name)
+        except FileNotFoundError:
+            pass
+        shm = publish_cube(build(), name)
+        atexit.register(_release, shm)
+    # Serve from the published copy as well, so this worker shares its pages.
+    return read_cube(shm), shm
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+dipTech Proprietary and Confidential
+Live data feed for the Sales KPI Dashboard.
+
+New sales are picked up either from rows appended to the source CSV or from
+CSV files dropped into a directory, and folded into the shared cube without
+reprocessing history.
+"""
+
+import glob
+import io
+import os
+
+import pandas as pd
+
+from sales_loader import parse_csv
+
+
+class SalesTail:
+    """Follow new rows appended to a CSV and new files in a drop directory.
+
+    Appended data is only consumed up to the last complete line, so a writer
+    caught in the middle of a row is picked up on the next poll. Drop files
+    must carry the same header as the source CSV and are never modified;
+    each one is read once, in file name order.
+    """
+
+    def __init__(self, path=None, offset=None, drop_dir=None):
+        self.path = path
+        self.drop_dir = drop_dir
+        self.offset = offset
+        self.seen = set()
+        self.columns = None
+        if path is not None:
+            with open(path, "rb") as f:
+                self.columns = f.readline().decode().strip().split(",")
+            if self.offset is None:
+                self.offset = os.path.getsize(path)
+
+    def _read_appended(self):
+        if self.path is None or os.path.getsize(self.path) <= self.offset:
+            return None
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            chunk = f.read()
+        end = chunk.rfind(b"\n") + 1
+        if not end:
+            return None
+        self.offset += end
+        return parse_csv(io.BytesIO(chunk[:end]), names=self.columns)
+
+    def _read_dropped(self):
+        if self.drop_dir is None:
+            return []
+        frames = []
+        for path in sorted(glob.glob(os.path.join(self.drop_dir, "*.csv"))):
+            if path in self.seen:
+                continue
+            frames.append(parse_csv(path))
+            self.seen.add(path)
+        return frames
+
+    def poll(self):
+        """Return the rows that arrived since the last poll, or None."""
+        frames = [self._read_appended(), *self._read_dropped()]
+        frames = [frame for frame in frames if frame is not None and not frame.empty]
+        if not frames:
+            return None
+        return pd.concat(frames, ignore_index=True)
+
+
+class LiveFeed:
+    """Scheduled task moving rows from a :class:`SalesTail` into a CubeStore."""
+
+    def __init__(self, store, tail):
+        self.store = store
+        self.tail = tail
+
+    def __call__(self):
+        try:
+            rows = self.tail.poll()
+        except (OSError, ValueError) as e:
+            print(f"[WARNING] Could not read new sales rows: {e}")
+            return
+        if rows is not None:
+            snapshot = self.store.append(rows)
+            print(f"[INFO] Added {len(rows)} sales rows (data version {snapshot.version})")
@@ -0,0 +1,63 @@
+"""Shared test fixtures
+
+The app is configured from the environment when ``app.main`` is imported,
+so the testing configuration (in-memory store, no flag provider) is
+selected here, before any test module imports it.
+"""
+
+import os
+
+os.environ["ENVIRONMENT"] = "testing"
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.pop("FLAGS_FILE", None)
+os.environ.pop("FLAGS_SSM_PATH", None)
+os.environ.pop("METRICS_DIR", None)
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import main  # noqa: E402
+from app.cache import ResponseCache  # noqa: E402
+from app.storage import MemoryItemStore, SQLiteItemStore  # noqa: E402
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    """An empty item store of each backend"""
+    if request.param == "memory":
+        store = MemoryItemStore()
+    else:
+        store = SQLiteItemStore(str(tmp_path / "items.db"))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def client(store, monkeypatch):
+    """Test client of the app serving ``store``, with an empty response cache
+
+    The client is not entered as a context manager, so the app's lifespan
+    (which closes the module-level store) does not run.
+    """
+    monkeypatch.setattr(main, "item_store", store)
+    monkeypatch.setattr(main, "response_cache", ResponseCache())
+    return TestClient(main.app)
+
+
+def make_item(item_id, name=None, price=1.0):
+    return {
+        "id": item_id,
+        "name": name if name is not None else f"item-{item_id}",
+        "description": "Test item",
+        "price": price,
+    }
+
+
+class Clock:
+    """Manually advanced monotonic clock"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
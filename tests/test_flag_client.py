@@ -0,0 +1,243 @@
+"""Cached SSM flag client, against a stubbed SSM client"""
+
+import json
+
+import boto3
+import pytest
+from botocore.stub import Stubber
+
+import app.flags  # noqa: F401  (puts feature-flag/ on sys.path)
+from flag_client import FlagClient
+
+from tests.conftest import Clock
+
+PATH = "/kognitos/dev"
+PARAMETER = f"{PATH}/config"
+DEFAULT = {"use-textract-ocr": "default"}
+
+
+@pytest.fixture
+def ssm():
+    client = boto3.client(
+        "ssm",
+        region_name="us-west-2",
+        aws_access_key_id="testing",
+        aws_secret_access_key="testing",
+    )
+    with Stubber(client) as stubber:
+        yield client, stubber
+        stubber.assert_no_pending_responses()
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def make_client(ssm_client, clock):
+    return FlagClient(
+        PARAMETER, ssm_client=ssm_client, ttl=10, stale_ttl=100, default=DEFAULT,
+        background_refresh=False, clock=clock,
+    )
+
+
+def parameter(name, value, version=1):
+    return {
+        "Name": name, "Type": "String", "Version": version,
+        "Value": value if isinstance(value, str) else json.dumps(value),
+    }
+
+
+def add_parameter(stubber, value, version=1):
+    stubber.add_response(
+        "get_parameter",
+        {"Parameter": parameter(PARAMETER, value, version)},
+        {"Name": PARAMETER},
+    )
+
+
+def test_config_is_cached_within_ttl(ssm, clock):
+    ssm_client, stubber = ssm
+    add_parameter(stubber, {"use-textract-ocr": "on"})
+    client = make_client(ssm_client, clock)
+
+    assert client.get_config() == {"use-textract-ocr": "on"}
+    clock.now = 9.9
+    assert client.get_config() == {"use-textract-ocr": "on"}
+
+
+def test_stale_config_is_served_while_revalidating(ssm, clock):
+    ssm_client, stubber = ssm
+    add_parameter(stubber, {"use-textract-ocr": "on"}, version=1)
+    add_parameter(stubber, {"use-textract-ocr": "off"}, version=2)
+    client = make_client(ssm_client, clock)
+    client.get_config()
+    first_version = client.version
+
+    clock.now = 50
+    assert client.get_config() == {"use-textract-ocr": "on"}
+    assert client.get_config() == {"use-textract-ocr": "off"}
+    assert client.version != first_version
+
+
+def test_expired_config_is_refreshed_inline(ssm, clock):
+    ssm_client, stubber = ssm
+    add_parameter(stubber, {"use-textract-ocr": "on"}, version=1)
+    add_parameter(stubber, {"use-textract-ocr": "off"}, version=2)
+    client = make_client(ssm_client, clock)
+    client.get_config()
+
+    clock.now = 110
+    assert client.get_config() == {"use-textract-ocr": "off"}
+
+
+def test_throttling_keeps_last_known_good(ssm, clock):
+    ssm_client, stubber = ssm
+    add_parameter(stubber, {"use-textract-ocr": "on"}, version=1)
+    stubber.add_client_error("get_parameter", "ThrottlingException")
+    add_parameter(stubber, {"use-textract-ocr": "off"}, version=2)
+    client = make_client(ssm_client, clock)
+    client.get_config()
+
+    clock.now = 110
+    assert client.get_config() == {"use-textract-ocr": "on"}
+    assert client.last_error is not None
+
+    # Not retried until another ttl has passed
+    clock.now = 115
+    assert client.get_config() == {"use-textract-ocr": "on"}
+
+    clock.now = 230
+    assert client.get_config() == {"use-textract-ocr": "off"}
+    assert client.last_error is None
+
+
+def test_invalid_json_keeps_last_known_good(ssm, clock):
+    ssm_client, stubber = ssm
+    add_parameter(stubber, {"use-textract-ocr": "on"}, version=1)
+    add_parameter(stubber, "{not json", version=2)
+    add_parameter(stubber, '["not", "an", "object"]', version=3)
+    client = make_client(ssm_client, clock)
+    client.get_config()
+    version = client.version
+
+    clock.now = 110
+    assert client.get_config() == {"use-textract-ocr": "on"}
+    assert isinstance(client.last_error, ValueError)
+
+    clock.now = 220
+    assert client.get_config() == {"use-textract-ocr": "on"}
+    assert client.version == version
+
+
+def test_default_is_used_only_before_first_success(ssm, clock):
+    ssm_client, stubber = ssm
+    stubber.add_client_error("get_parameter", "ThrottlingException")
+    add_parameter(stubber, {"use-textract-ocr": "on"})
+    stubber.add_client_error("get_parameter", "InternalServerError", http_status_code=500)
+    client = make_client(ssm_client, clock)
+
+    assert client.get_config() == DEFAULT
+    # The failed first fetch is retried after ttl, not on every call
+    clock.now = 5
+    assert client.get_config() == DEFAULT
+
+    clock.now = 10
+    assert client.get_config() == {"use-textract-ocr": "on"}
+
+    clock.now = 200
+    assert client.get_config() == {"use-textract-ocr": "on"}
+
+
+def add_pages(stubber, *pages):
+    for number, page in enumerate(pages):
+        response = {"Parameters": page}
+        if number < len(pages) - 1:
+            response["NextToken"] = f"page-{number + 1}"
+        params = {"Path": PATH, "Recursive": True}
+        if number:
+            params["NextToken"] = f"page-{number}"
+        stubber.add_response("get_parameters_by_path", response, params)
+
+
+def make_path_client(ssm_client, clock):
+    return FlagClient(
+        path=PATH + "/", ssm_client=ssm_client, ttl=10, default=DEFAULT,
+        background_refresh=False, clock=clock,
+    )
+
+
+def test_hierarchy_is_read_across_pages_and_merged(ssm, clock):
+    ssm_client, stubber = ssm
+    add_pages(
+        stubber,
+        [
+            parameter(f"{PATH}/textract/use-textract-ocr", "off"),
+            parameter(f"{PATH}/config", {"use-textract-ocr": "on", "pages": 10}),
+        ],
+        [
+            parameter(f"{PATH}/textract/config", {"pages": 20, "engine": "v2"}),
+            parameter(f"{PATH}/limit", "5"),
+            parameter(f"{PATH}/mode", "fast"),
+        ],
+    )
+    client = make_path_client(ssm_client, clock)
+
+    # Deeper parameters override shallower ones, single flags override
+    # config objects at the same level
+    assert client.get_config() == {
+        "use-textract-ocr": "off",
+        "pages": 20,
+        "engine": "v2",
+        "limit": 5,
+        "mode": "fast",
+    }
+
+
+def test_hierarchy_version_follows_parameter_versions(ssm, clock):
+    ssm_client, stubber = ssm
+    add_pages(stubber, [parameter(f"{PATH}/mode", "fast", version=1)])
+    add_pages(stubber, [parameter(f"{PATH}/mode", "fast", version=1)])
+    add_pages(stubber, [parameter(f"{PATH}/mode", "slow", version=2)])
+    client = make_path_client(ssm_client, clock)
+
+    client.get_config()
+    first = client.version
+    clock.now = 400
+    client.get_config()
+    assert client.version == first
+    clock.now = 800
+    assert client.get_config() == {"mode": "slow"}
+    assert client.version != first
+
+
+def test_empty_hierarchy_is_a_failed_fetch(ssm, clock):
+    ssm_client, stubber = ssm
+    add_pages(stubber, [])
+    client = make_path_client(ssm_client, clock)
+
+    assert client.get_config() == DEFAULT
+    assert isinstance(client.last_error, ValueError)
+
+
+def test_named_parameters_are_read_in_batches(ssm, clock):
+    ssm_client, stubber = ssm
+    names = [f"{PATH}/flag-{n}" for n in range(12)]
+    stubber.add_response(
+        "get_parameters",
+        {"Parameters": [parameter(name, "on") for name in names[:10]]},
+        {"Names": names[:10]},
+    )
+    stubber.add_response(
+        "get_parameters",
+        {"Parameters": [parameter(names[10], "off")], "InvalidParameters": [names[11]]},
+        {"Names": names[10:]},
+    )
+    client = FlagClient(
+        names=names, ssm_client=ssm_client, background_refresh=False, clock=clock
+    )
+
+    config = client.get_config()
+    assert len(config) == 11
+    assert config["flag-0"] == "on"
+    assert config["flag-10"] == "off"
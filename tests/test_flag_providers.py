@@ -0,0 +1,109 @@
+"""Flag providers: static and hot-reloaded local file"""
+
+import json
+import os
+import time
+
+import pytest
+
+import app.flags  # noqa: F401  (puts feature-flag/ on sys.path)
+from flag_providers import FileFlagProvider, StaticFlagProvider, create_provider
+
+from tests.conftest import Clock
+
+
+def write_flags(path, flags):
+    """Replace the file atomically, as the provider expects"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(flags, f)
+    os.replace(tmp, path)
+
+
+def bump_mtime(path):
+    """Make sure the rewrite is seen even on coarse mtime filesystems"""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture
+def flag_file(tmp_path):
+    path = tmp_path / "flags.json"
+    write_flags(path, {"ocr": "on"})
+    return str(path)
+
+
+def test_static_provider():
+    provider = create_provider("static", config={"ocr": "on"})
+    assert isinstance(provider, StaticFlagProvider)
+    assert provider.get("ocr") == "on"
+    assert provider.get("missing", "off") == "off"
+
+
+def test_file_provider_polls_for_changes(flag_file):
+    clock = Clock()
+    provider = FileFlagProvider(flag_file, watch=False, poll_interval=1.0, clock=clock)
+    config, version = provider.get_config(), provider.version
+    assert config == {"ocr": "on"}
+
+    write_flags(flag_file, {"ocr": "off"})
+    bump_mtime(flag_file)
+    clock.now = 0.5
+    assert provider.get_config() is config
+
+    clock.now = 1.5
+    assert provider.get_config() == {"ocr": "off"}
+    assert provider.version != version
+
+
+def test_file_provider_returns_the_same_snapshot_until_it_changes(flag_file):
+    clock = Clock()
+    provider = FileFlagProvider(flag_file, watch=False, clock=clock)
+    config = provider.get_config()
+
+    # Rewritten with the same content: same snapshot, nothing recompiled
+    write_flags(flag_file, {"ocr": "on"})
+    bump_mtime(flag_file)
+    clock.now = 10
+    assert provider.get_config() is config
+
+
+def test_invalid_file_keeps_last_good_flags(flag_file):
+    clock = Clock()
+    provider = FileFlagProvider(flag_file, watch=False, clock=clock)
+    version = provider.version
+
+    with open(flag_file, "w") as f:
+        f.write("{broken")
+    bump_mtime(flag_file)
+    clock.now = 10
+    assert provider.get_config() == {"ocr": "on"}
+    assert provider.version == version
+    assert provider.last_error is not None
+
+    write_flags(flag_file, ["not", "an", "object"])
+    bump_mtime(flag_file)
+    clock.now = 20
+    assert provider.get_config() == {"ocr": "on"}
+
+
+def test_missing_file_uses_default(tmp_path):
+    provider = FileFlagProvider(
+        str(tmp_path / "missing.json"), default={"ocr": "default"}, watch=False
+    )
+    assert provider.get_config() == {"ocr": "default"}
+    assert provider.version is None
+
+
+def test_file_provider_reloads_on_watchdog_events(flag_file):
+    pytest.importorskip("watchdog")
+    provider = FileFlagProvider(flag_file)
+    try:
+        assert provider._observer is not None
+        write_flags(flag_file, {"ocr": "off"})
+        deadline = time.monotonic() + 5
+        while provider.get_config() != {"ocr": "off"} and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert provider.get_config() == {"ocr": "off"}
+    finally:
+        provider.close()
@@ -0,0 +1,105 @@
+"""Feature flag rule engine"""
+
+import app.flags  # noqa: F401  (puts feature-flag/ on sys.path)
+from flag_rules import BUCKETS, CompiledFlags, RuleEngine, bucket
+
+
+def test_literals_and_plain_objects_are_returned_as_is():
+    flags = CompiledFlags({"ocr": "on", "limits": {"pages": 50}})
+    assert flags.evaluate("ocr") == "on"
+    assert flags.evaluate("limits") == {"pages": 50}
+    assert flags.evaluate("missing", default="off") == "off"
+    assert flags.errors == {}
+
+
+def test_first_matching_rule_wins():
+    flags = CompiledFlags({"ocr": {
+        "default": "off",
+        "rules": [
+            {"users": ["alice"], "value": "alice"},
+            {"tenants": ["acme"], "value": "acme"},
+            {"users": ["alice", "bob"], "tenants": ["acme"], "value": "unreachable"},
+        ],
+    }})
+    assert flags.evaluate("ocr", {"user_id": "alice", "tenant_id": "acme"}) == "alice"
+    assert flags.evaluate("ocr", {"user_id": "bob", "tenant_id": "acme"}) == "acme"
+    assert flags.evaluate("ocr", {"user_id": "bob"}) == "off"
+    assert flags.evaluate("ocr") == "off"
+
+
+def test_rule_value_defaults_to_true_and_default_to_false():
+    flags = CompiledFlags({"beta": {"rules": [{"users": [1, 2]}]}})
+    assert flags.evaluate("beta", {"user_id": 2}) is True
+    assert flags.is_enabled("beta", {"user_id": "1"})
+    assert flags.evaluate("beta", {"user_id": 3}) is False
+
+
+def test_environment_overrides_apply_to_their_environment_only():
+    definition = {
+        "default": "off",
+        "rules": [{"users": ["alice"], "value": "on"}],
+        "environments": {
+            "prod": {"rules": [{"tenants": ["acme"], "value": "on"}]},
+            "test": {"enabled": False, "default": "test"},
+        },
+    }
+    config = {"ocr": definition}
+    alice, acme = {"user_id": "alice"}, {"tenant_id": "acme"}
+
+    dev = CompiledFlags(config, "dev")
+    assert (dev.evaluate("ocr", alice), dev.evaluate("ocr", acme)) == ("on", "off")
+    prod = CompiledFlags(config, "prod")
+    assert (prod.evaluate("ocr", alice), prod.evaluate("ocr", acme)) == ("off", "on")
+    assert CompiledFlags(config, "test").evaluate("ocr", alice) == "test"
+
+
+def rollout(percentage, by="user_id", salt=None):
+    definition = {"rules": [{"percentage": percentage, "by": by}]}
+    if salt is not None:
+        definition["salt"] = salt
+    return CompiledFlags({"rollout": definition})
+
+
+def enabled_users(flags, users, by="user_id"):
+    return {user for user in users if flags.is_enabled("rollout", {by: user})}
+
+
+def test_percentage_buckets_are_stable_as_the_rollout_grows():
+    users = [f"user-{n}" for n in range(2000)]
+    previous = set()
+    for percentage in (0, 10, 25, 50, 100):
+        selected = enabled_users(rollout(percentage), users)
+        assert previous <= selected
+        assert abs(len(selected) - len(users) * percentage / 100) < len(users) * 0.05
+        previous = selected
+
+    assert enabled_users(rollout(25), users) == enabled_users(rollout(25), users)
+    assert not rollout(100).is_enabled("rollout", {"tenant_id": "acme"})
+
+
+def test_percentage_buckets_depend_on_salt_and_attribute():
+    users = [f"user-{n}" for n in range(2000)]
+    assert enabled_users(rollout(50), users) != enabled_users(rollout(50, salt="other"), users)
+    assert enabled_users(rollout(50, by="tenant_id"), users, by="tenant_id")
+    assert all(0 <= bucket("rollout", user) < BUCKETS for user in users)
+
+
+def test_invalid_definitions_are_reported_in_errors():
+    flags = CompiledFlags({
+        "ok": "on",
+        "bad-rule-key": {"rules": [{"user": ["alice"]}]},
+        "bad-key": {"rules": [], "defualt": "on"},
+        "bad-percentage": {"rules": [{"percentage": 150}]},
+        "bad-rules": {"rules": 5},
+    })
+    assert set(flags.errors) == {"bad-rule-key", "bad-key", "bad-percentage", "bad-rules"}
+    assert flags.evaluate("bad-key", default="fallback") == "fallback"
+    assert flags.evaluate_all() == {"ok": "on"}
+
+
+def test_engine_compiles_each_snapshot_once():
+    engine = RuleEngine("dev")
+    config = {"ocr": "on"}
+    compiled = engine.compile(config)
+    assert engine.compile(config) is compiled
+    assert engine.compile(dict(config)) is not compiled
@@ -0,0 +1,225 @@
+"""Items API: conditional writes, bulk endpoints and search"""
+
+import json
+import sqlite3
+
+from app import main
+from tests.conftest import make_item
+
+
+def test_get_returns_etag_and_304(client):
+    client.post("/items", json=make_item(1))
+    response = client.get("/items/1")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    response = client.get("/items/1", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_update_with_current_etag_succeeds(client):
+    client.post("/items", json=make_item(1))
+    etag = client.get("/items/1").headers["ETag"]
+
+    response = client.put("/items/1", json=make_item(1, price=2.0), headers={"If-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert client.get("/items/1").json()["price"] == 2.0
+
+
+def test_update_with_stale_etag_is_412(client):
+    client.post("/items", json=make_item(1))
+    stale = client.get("/items/1").headers["ETag"]
+    client.put("/items/1", json=make_item(1, price=2.0))
+
+    response = client.put("/items/1", json=make_item(1, price=3.0), headers={"If-Match": stale})
+    assert response.status_code == 412
+    assert response.headers["ETag"] == client.get("/items/1").headers["ETag"]
+    assert client.get("/items/1").json()["price"] == 2.0
+
+
+def test_delete_with_stale_etag_is_412(client):
+    client.post("/items", json=make_item(1))
+    stale = client.get("/items/1").headers["ETag"]
+    client.put("/items/1", json=make_item(1, price=2.0))
+
+    assert client.delete("/items/1", headers={"If-Match": stale}).status_code == 412
+    assert client.get("/items/1").status_code == 200
+
+
+def test_if_match_star_is_unconditional(client):
+    client.post("/items", json=make_item(1))
+    response = client.put("/items/1", json=make_item(1, price=2.0), headers={"If-Match": "*"})
+    assert response.status_code == 200
+
+
+def test_bulk_create_non_atomic_reports_failures(client):
+    client.post("/items", json=make_item(2))
+    response = client.post("/items/bulk", json=[make_item(1), make_item(2), make_item(3)])
+    assert response.status_code == 200
+    assert response.json() == {
+        "requested": 3,
+        "succeeded": 2,
+        "failed": [{"index": 1, "id": 2, "error": "Item already exists"}],
+        "committed": True,
+    }
+    assert client.get("/stats").json()["total_items"] == 3
+
+
+def test_bulk_create_atomic_is_rejected_with_409(client):
+    client.post("/items", json=make_item(2))
+    response = client.post(
+        "/items/bulk?atomic=true", json=[make_item(1), make_item(2), make_item(3)]
+    )
+    assert response.status_code == 409
+    summary = response.json()
+    assert summary["committed"] is False
+    assert summary["succeeded"] == 0
+    assert summary["failed"] == [{"index": 1, "id": 2, "error": "Item already exists"}]
+    assert client.get("/stats").json()["total_items"] == 1
+
+
+def test_bulk_create_accepts_ndjson(client):
+    body = "\n".join(
+        '{"id": %d, "name": "n%d", "price": 1.5}' % (i, i) for i in range(3)
+    )
+    response = client.post(
+        "/items/bulk", content=body, headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.json()["succeeded"] == 3
+
+
+NDJSON = {"Content-Type": "application/x-ndjson"}
+
+
+def test_bulk_ndjson_lines_are_parsed_one_by_one(client):
+    response = client.request("DELETE", "/items/bulk", content="1\n\n2,3\n", headers=NDJSON)
+    assert response.status_code == 422
+    [error] = response.json()["detail"]
+    assert error["loc"] == [3]
+    assert "line 3" in error["msg"]
+
+
+def test_bulk_ndjson_errors_name_the_line(client):
+    body = '{"id": 1, "name": "a", "price": 1}\n\n{"id": 2, "price": 1}'
+    response = client.post("/items/bulk", content=body, headers=NDJSON)
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == [3, "name"]
+    assert client.get("/stats").json()["total_items"] == 0
+
+
+def test_bulk_limits_are_checked_before_parsing(client, monkeypatch):
+    monkeypatch.setattr(main.config, "MAX_BULK_ITEMS", 2)
+    monkeypatch.setattr(main.config, "MAX_BULK_BYTES", 50)
+
+    response = client.request("DELETE", "/items/bulk", json=list(range(100)))
+    assert response.status_code == 413
+    assert "bytes" in response.json()["detail"]
+
+    response = client.request("DELETE", "/items/bulk", content="1\n2\n3", headers=NDJSON)
+    assert response.status_code == 413
+    assert "items" in response.json()["detail"]
+
+
+def test_bulk_update_atomic_is_rejected_with_409(client):
+    client.post("/items", json=make_item(1))
+    response = client.put(
+        "/items/bulk?atomic=true", json=[make_item(1, price=9.0), make_item(2)]
+    )
+    assert response.status_code == 409
+    assert response.json()["failed"] == [{"index": 1, "id": 2, "error": "Item not found"}]
+    assert client.get("/items/1").json()["price"] == 1.0
+
+
+def test_bulk_delete(client):
+    client.post("/items/bulk", json=[make_item(1), make_item(2), make_item(3)])
+
+    response = client.request("DELETE", "/items/bulk?atomic=true", json=[1, 1, 2])
+    assert response.status_code == 200
+    assert response.json()["succeeded"] == 3
+
+    response = client.request("DELETE", "/items/bulk", json=[3, 4])
+    assert response.status_code == 200
+    assert response.json()["failed"] == [{"index": 1, "id": 4, "error": "Item not found"}]
+    assert client.get("/stats").json()["total_items"] == 0
+
+
+def test_search_and_keyset_pages(client):
+    client.post("/items/bulk", json=[
+        make_item(item_id, name=name, price=price)
+        for item_id, name, price in [
+            (1, "apple", 3.0), (2, "apricot", 1.0), (3, "banana", 2.0), (4, "app", 5.0)
+        ]
+    ])
+
+    response = client.get("/items/search", params={"prefix": "ap", "sort": "-price"})
+    assert [item["id"] for item in response.json()["items"]] == [4, 1, 2]
+
+    response = client.get("/items/search", params={"max_price": 3, "sort": "name"})
+    assert [item["name"] for item in response.json()["items"]] == ["apple", "apricot", "banana"]
+
+    pages, after = [], None
+    while True:
+        params = {"limit": 3} if after is None else {"limit": 3, "after": after}
+        page = client.get("/items", params=params).json()
+        pages.append([item["id"] for item in page["items"]])
+        after = page["next_cursor"]
+        if after is None:
+            break
+    assert pages == [[1, 2, 3], [4]]
+
+
+def test_list_projects_fields(client):
+    client.post("/items/bulk", json=[make_item(1), make_item(2)])
+    response = client.get("/items", params={"fields": "id,price"})
+    assert response.json()["items"] == [{"id": 1, "price": 1.0}, {"id": 2, "price": 1.0}]
+
+    response = client.get("/items/search", params={"fields": "name"})
+    assert response.json()["items"] == [{"name": "item-1"}, {"name": "item-2"}]
+
+    response = client.get("/items", params={"fields": "id,secret"})
+    assert response.status_code == 400
+
+
+def test_list_streams_ndjson(client):
+    client.post("/items/bulk", json=[make_item(item_id) for item_id in range(1, 8)])
+
+    response = client.get("/items", params={"format": "ndjson"})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [item["id"] for item in lines] == list(range(1, 8))
+    assert lines[0] == make_item(1)
+
+    response = client.get(
+        "/items", params={"format": "ndjson", "after": 2, "limit": 3, "fields": "id"}
+    )
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {"id": 3}, {"id": 4}, {"id": 5}
+    ]
+
+
+def test_ndjson_is_read_in_batches(client, store, monkeypatch):
+    client.post("/items/bulk", json=[make_item(item_id) for item_id in range(1, 6)])
+    monkeypatch.setattr(main.config, "STREAM_BATCH_SIZE", 2)
+    pages = []
+    page = store.page
+
+    def recording_page(after=None, limit=100):
+        pages.append((after, limit))
+        return page(after, limit)
+
+    monkeypatch.setattr(store, "page", recording_page)
+    response = client.get("/items", params={"format": "ndjson"})
+    assert len(response.text.splitlines()) == 5
+    assert pages == [(None, 2), (2, 2), (4, 2)]
+
+
+def test_locked_database_is_503(client, store, monkeypatch):
+    def locked(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    client.post("/items", json=make_item(1))
+    monkeypatch.setattr(store, "update", locked)
+    response = client.put("/items/1", json=make_item(1, price=2.0))
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,121 @@
+"""Prometheus metrics: exposition format and the multiprocess merge"""
+
+import json
+import os
+import subprocess
+import sys
+
+from app import metrics
+from tests.conftest import make_item
+
+
+def test_render_counters_and_cumulative_histograms():
+    values = metrics.Metrics()
+    values.observe_request("GET", "/items/{item_id}", 200, 0.003, 0, 100)
+    values.observe_request("GET", "/items/{item_id}", 200, 0.2, 0, 5000)
+    values.observe_request("GET", "/items/{item_id}", 404, 10.0, 0, 30)
+    text = metrics.render(metrics.merge([values.snapshot()]), {
+        "items_stored": ("Items in the store", 3),
+        "items_store_size_bytes": ("Storage size in bytes", None),
+    })
+    lines = text.splitlines()
+
+    labels = 'method="GET",route="/items/{item_id}"'
+    assert "# TYPE http_requests_total counter" in lines
+    assert f'http_requests_total{{{labels},status="200"}} 2' in lines
+    assert f'http_requests_total{{{labels},status="404"}} 1' in lines
+    assert "# TYPE http_request_duration_seconds histogram" in lines
+    assert f'http_request_duration_seconds_bucket{{{labels},le="0.001"}} 0' in lines
+    assert f'http_request_duration_seconds_bucket{{{labels},le="0.005"}} 1' in lines
+    assert f'http_request_duration_seconds_bucket{{{labels},le="5"}} 2' in lines
+    assert f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 3' in lines
+    assert f"http_request_duration_seconds_count{{{labels}}} 3" in lines
+    assert "http_requests_in_flight 0" in lines
+    assert "items_stored 3" in lines
+    assert not any(line.startswith("items_store_size_bytes") for line in lines)
+    assert text.endswith("\n")
+
+
+def test_label_values_are_escaped():
+    values = metrics.Metrics()
+    values.observe_request("GET", 'a"b\\c', 200, 0.1, 0, 0)
+    text = metrics.render(metrics.merge([values.snapshot()]))
+    assert 'route="a\\"b\\\\c"' in text
+
+
+def test_merge_sums_counters_histograms_and_in_flight():
+    first, second = metrics.Metrics(), metrics.Metrics()
+    first.observe_request("GET", "/items", 200, 0.01, 10, 100)
+    second.observe_request("GET", "/items", 200, 0.02, 20, 200)
+    second.observe_request("POST", "/items", 201, 0.02, 20, 200)
+    second.in_flight = 2
+
+    merged = metrics.merge([first.snapshot(), second.snapshot()])
+    families = merged["families"]
+    assert merged["in_flight"] == 2
+    assert families["http_requests_total"][("GET", "/items", "200")] == 2
+    assert families["http_requests_total"][("POST", "/items", "201")] == 1
+    latency = families["http_request_duration_seconds"][("GET", "/items")]
+    assert latency["count"] == 2
+    assert sum(latency["counts"]) == 2
+    assert abs(latency["sum"] - 0.03) < 1e-9
+
+
+def other_worker(directory, pid, in_flight):
+    values = metrics.Metrics()
+    values.observe_request("GET", "/items", 200, 0.01, 0, 0)
+    snapshot = {**values.snapshot(), "pid": pid, "in_flight": in_flight}
+    with open(os.path.join(directory, f"metrics-{pid}.json"), "w") as f:
+        json.dump(snapshot, f)
+
+
+def exited_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_exporter_merges_other_workers(tmp_path):
+    directory = str(tmp_path)
+    values = metrics.Metrics()
+    values.observe_request("GET", "/items", 200, 0.01, 0, 0)
+    values.in_flight = 1
+    exporter = metrics.MultiprocessExporter(values, directory, interval=60)
+
+    exporter.flush()
+    with open(exporter.path) as f:
+        assert json.load(f)["pid"] == os.getpid()
+    other_worker(directory, os.getppid(), in_flight=2)
+    other_worker(directory, exited_pid(), in_flight=5)
+    with open(os.path.join(directory, "metrics-999999999.json"), "w") as f:
+        f.write("{truncated")
+
+    # This worker's own file is skipped in favour of its live values
+    values.observe_request("GET", "/items", 200, 0.01, 0, 0)
+    merged = exporter.collect()
+    assert merged["families"]["http_requests_total"][("GET", "/items", "200")] == 4
+    # Exited workers keep their counters but not their in-flight requests
+    assert merged["in_flight"] == 3
+
+
+def test_exporter_flush_thread_writes_snapshots(tmp_path):
+    values = metrics.Metrics()
+    exporter = metrics.MultiprocessExporter(values, str(tmp_path), interval=0.01)
+    exporter.start()
+    try:
+        values.observe_request("GET", "/items", 200, 0.01, 0, 0)
+    finally:
+        exporter.stop()
+    with open(exporter.path) as f:
+        families = json.load(f)["families"]
+    assert families["http_requests_total"] == [[["GET", "/items", "200"], 1]]
+
+
+def test_metrics_endpoint(client):
+    client.post("/items", json=make_item(1))
+    client.get("/items/1")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == metrics.CONTENT_TYPE
+    assert 'route="/items/{item_id}",status="200"' in response.text
+    assert "items_stored 1" in response.text.splitlines()
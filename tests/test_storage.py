@@ -0,0 +1,149 @@
+"""Item store backends: compare-and-set, bulk writes and index parity"""
+
+import itertools
+import random
+import threading
+
+import pytest
+
+from app.storage import MemoryItemStore, SQLiteItemStore, VersionConflict
+from tests.conftest import make_item
+
+
+def test_update_with_stale_version_raises(store):
+    store.create(make_item(1))
+    _, version = store.get_versioned(1)
+    assert store.update(1, make_item(1, price=2.0), expected_version=version)
+
+    with pytest.raises(VersionConflict) as conflict:
+        store.update(1, make_item(1, price=3.0), expected_version=version)
+    assert conflict.value.version == store.get_versioned(1)[1]
+    assert store.get(1)["price"] == 2.0
+
+
+def test_concurrent_compare_and_set_loses_no_writes(store):
+    store.create(make_item(1, price=0.0))
+    threads, increments = 8, 25
+    start = threading.Barrier(threads)
+
+    def increment():
+        start.wait()
+        for _ in range(increments):
+            while True:
+                item, version = store.get_versioned(1)
+                try:
+                    store.update(
+                        1, {**item, "price": item["price"] + 1}, expected_version=version
+                    )
+                    break
+                except VersionConflict:
+                    continue
+
+    workers = [threading.Thread(target=increment) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert store.get(1)["price"] == threads * increments
+
+
+def test_create_many_atomic_rejects_whole_batch(store):
+    store.create(make_item(2))
+    results = store.create_many([make_item(1), make_item(2), make_item(3)], atomic=True)
+    assert results == [True, False, True]
+    assert store.count() == 1
+
+
+def test_create_many_reports_duplicates_within_batch(store):
+    results = store.create_many([make_item(1), make_item(1, name="again")])
+    assert results == [True, False]
+    assert store.get(1)["name"] == "item-1"
+
+
+def test_update_many_non_atomic_applies_the_rest(store):
+    store.create(make_item(1))
+    results = store.update_many([make_item(1, price=5.0), make_item(2)])
+    assert results == [True, False]
+    assert store.get(1)["price"] == 5.0
+    assert store.get(2) is None
+
+
+def test_delete_many_atomic_with_repeated_id(store):
+    store.create_many([make_item(1), make_item(2)])
+    assert store.delete_many([1, 1, 2], atomic=True) == [True, True, True]
+    assert store.count() == 0
+
+
+def test_delete_many_atomic_rejects_missing_id(store):
+    store.create_many([make_item(1), make_item(2)])
+    assert store.delete_many([1, 3], atomic=True) == [True, False]
+    assert store.count() == 2
+
+
+NAMES = ["apple", "apricot", "app", "banana", "Band", "cherry", "퟿", "\U0010ffff"]
+
+
+@pytest.fixture
+def populated(tmp_path):
+    """The same random items in a memory and a SQLite store"""
+    rng = random.Random(7)
+    items = [
+        make_item(
+            item_id,
+            name=rng.choice(NAMES) + rng.choice(["", "-1", "-2"]),
+            price=float(rng.randint(1, 20)),
+        )
+        for item_id in rng.sample(range(1, 1000), 200)
+    ]
+    memory, sqlite = MemoryItemStore(), SQLiteItemStore(str(tmp_path / "items.db"))
+    for store in (memory, sqlite):
+        store.create_many(items)
+        for item_id in [item["id"] for item in items][::5]:
+            store.delete(item_id)
+    yield memory, sqlite
+    sqlite.close()
+
+
+def ids(items):
+    return [item["id"] for item in items]
+
+
+@pytest.mark.parametrize("sort", ["id", "name", "price"])
+@pytest.mark.parametrize("descending", [False, True])
+def test_search_matches_between_backends(populated, sort, descending):
+    memory, sqlite = populated
+    filters = itertools.product(
+        [None, 5.0], [None, 15.0], [None, "ap", "Ban", "퟿", "\U0010ffff"], [None, "-1"]
+    )
+    for min_price, max_price, prefix, contains in filters:
+        for limit in (None, 10):
+            query = dict(
+                min_price=min_price, max_price=max_price, prefix=prefix,
+                contains=contains, sort=sort, descending=descending, limit=limit,
+            )
+            assert ids(memory.search(**query)) == ids(sqlite.search(**query)), query
+
+
+def test_search_prefix_matches_names(populated):
+    for store in populated:
+        for prefix in ("ap", "퟿", "\U0010ffff"):
+            found = store.search(prefix=prefix, limit=None)
+            expected = [item for item in store.list() if item["name"].startswith(prefix)]
+            assert ids(found) == ids(expected)
+
+
+def test_keyset_pages_match_between_backends(populated):
+    memory, sqlite = populated
+    for limit in (1, 7, 50):
+        after = None
+        while True:
+            page = memory.page(after, limit)
+            assert ids(page) == ids(sqlite.page(after, limit))
+            if len(page) < limit:
+                break
+            after = page[-1]["id"]
+
+    assert ids(memory.iter_items(batch_size=9)) == ids(memory.list())
+    assert ids(sqlite.iter_items(batch_size=9)) == ids(memory.list())
+    assert ids(sqlite.iter_items(after=500)) == [i for i in ids(memory.list()) if i > 500]